@@ -9,14 +9,27 @@ import streamlit as st
 from datetime import date
 
 from components.auth import is_authenticated, logout, get_current_user
-from utils.database import get_tasks_by_date, get_task_completion_rate
+from components.debug_panel import start_page_profile, render_profile_panel
+from components.stale_notice import render_offline_notice, render_stale_notice
+from utils.database import (
+    count_offline_task_changes,
+    pop_offline_conflicts,
+    get_tasks_by_date_with_status,
+    get_daily_focus_minutes_with_status,
+)
+from utils.reminders import ensure_reminder_engine_started
+from utils.scheduler import ensure_scheduler_started
 from utils.constants import WEEKDAY_LABELS
+from utils.profiler import profile_section
 
 st.set_page_config(
     page_title="モンクモード",
     page_icon="🧘",
     layout="wide",
 )
+start_page_profile("home")
+ensure_scheduler_started()
+ensure_reminder_engine_started()
 
 # 認証チェック
 if not is_authenticated():
@@ -43,8 +56,12 @@ with col2:
 
 st.divider()
 
-# タスク取得
-tasks = get_tasks_by_date(user["id"], today_str)
+# タスク・集中時間取得（応答が遅い場合は前回取得したデータを表示）
+tasks_result = get_tasks_by_date_with_status(user["id"], today_str)
+focus_result = get_daily_focus_minutes_with_status(user["id"], today_str, today_str)
+render_stale_notice(tasks_result, focus_result)
+render_offline_notice(count_offline_task_changes(user["id"]), pop_offline_conflicts(user["id"]))
+tasks = tasks_result.value
 
 # メインコンテンツ（3カラム）
 col_left, col_center, col_right = st.columns([2, 5, 2])
@@ -58,16 +75,18 @@ with col_left:
     st.divider()
 
     total_tasks = len(tasks)
-    completed_tasks = len([t for t in tasks if t["is_completed"]])
+    completed_tasks = sum(1 for t in tasks if t.is_completed)
     st.metric("今日のタスク", f"{completed_tasks}/{total_tasks}")
 
+    st.metric("今日の集中時間", f"{focus_result.value.get(today_str, 0)}分")
+
 # 中央カラム: 今日のタスク
 with col_center:
     st.subheader("📋 今日のタスク")
 
     if tasks:
         # 達成率
-        completion_rate = get_task_completion_rate(user["id"], today_str)
+        completion_rate = completed_tasks / total_tasks
         st.progress(completion_rate, text=f"達成率: {int(completion_rate * 100)}%")
 
         st.write("")
@@ -75,30 +94,31 @@ with col_center:
         # タスク表示（最大5件）
         display_tasks = tasks[:5]
 
-        for task in display_tasks:
-            col_check, col_task = st.columns([0.5, 9.5])
-
-            with col_check:
-                st.checkbox(
-                    "",
-                    value=task["is_completed"],
-                    key=f"home_task_{task['id']}",
-                    disabled=True,
-                    label_visibility="collapsed",
-                )
-
-            with col_task:
-                if task["is_completed"]:
-                    st.markdown(
-                        f"~~{task['title']}~~ 🏷️ {task['category']}",
-                        help=task.get("description", ""),
-                    )
-                else:
-                    st.markdown(
-                        f"**{task['title']}** 🏷️ {task['category']}",
-                        help=task.get("description", ""),
+        with profile_section("render"):
+            for task in display_tasks:
+                col_check, col_task = st.columns([0.5, 9.5])
+
+                with col_check:
+                    st.checkbox(
+                        "",
+                        value=task.is_completed,
+                        key=f"home_task_{task.id}",
+                        disabled=True,
+                        label_visibility="collapsed",
                     )
 
+                with col_task:
+                    if task.is_completed:
+                        st.markdown(
+                            f"~~{task.title}~~ 🏷️ {task.category}",
+                            help=task.description or "",
+                        )
+                    else:
+                        st.markdown(
+                            f"**{task.title}** 🏷️ {task.category}",
+                            help=task.description or "",
+                        )
+
         # 5件を超える場合
         if len(tasks) > 5:
             st.caption(f"他 {len(tasks) - 5} 件のタスク")
@@ -124,3 +144,5 @@ with col_right:
     st.divider()
 
     st.caption("その他の機能は後のスプリントで追加予定")
+
+render_profile_panel()
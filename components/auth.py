@@ -18,6 +18,7 @@ import streamlit as st
 
 from utils.supabase_client import supabase
 from utils.constants import MIN_PASSWORD_LENGTH
+from utils.reminders import default_settings, get_reminder_engine
 
 logger = logging.getLogger(__name__)
 
@@ -105,6 +106,11 @@ def signup(email: str, password: str, display_name: str) -> bool:
         }
         st.session_state["authenticated"] = True
 
+        # 通知設定の行はまだないため、配信中のエンジンには既定の設定で予定する
+        engine = get_reminder_engine()
+        if engine is not None:
+            engine.update_settings(default_settings(response.user.id))
+
         logger.info("User signed up: %s", email)
         return True
 
@@ -0,0 +1,95 @@
+"""
+グラフ表示コンポーネント
+
+推移グラフのPlotly図の定義を (ユーザー, 指標, 期間, データの版) をキーに
+キャッシュする。記録が変わらない限り、rerunのたびに元データの取得や
+図の組み立てをやり直さず、間引き済みの同じ小さな図を再利用する。
+データの版は期間内の行数と最終更新時刻のため、記録の追加・更新・削除で
+自動的に作り直される。
+"""
+
+from datetime import date
+from typing import Dict
+
+import plotly.graph_objects as go
+import streamlit as st
+
+from utils.chart_data import get_chart_data_version, get_chart_series
+from utils.constants import CHART_CACHE_MAX_ENTRIES, CHART_METRICS, COLORS
+from utils.exceptions import DatabaseError
+from utils.profiler import profiled
+
+RESOLUTION_LABELS = {"day": "日別", "week": "週平均", "month": "月平均"}
+
+# 点が少ないときだけマーカーを表示する
+MARKER_MAX_POINTS = 60
+
+
+@st.cache_data(max_entries=CHART_CACHE_MAX_ENTRIES, show_spinner=False)
+def _build_figure_spec(user_id: str, metric: str, start: date, end: date, version: str) -> Dict:
+    """
+    推移グラフの図の定義を作成（versionはキャッシュキーとしてのみ使用）
+
+    Raises:
+        DatabaseError: データ取得に失敗した場合（失敗結果はキャッシュしない）
+    """
+    series = get_chart_series(user_id, metric, start, end)
+    if series is None:
+        raise DatabaseError(f"Failed to load chart data: {metric}")
+
+    figure = go.Figure(
+        go.Scatter(
+            x=[day.isoformat() for day in series.dates],
+            y=series.values,
+            mode="lines+markers" if len(series.dates) <= MARKER_MAX_POINTS else "lines",
+            line={"color": COLORS["primary"]},
+            name=CHART_METRICS[metric],
+        )
+    )
+    figure.update_layout(
+        height=300,
+        margin={"l": 10, "r": 10, "t": 10, "b": 10},
+        yaxis_title=CHART_METRICS[metric],
+        showlegend=False,
+    )
+
+    spec = figure.to_dict()
+    spec["meta"] = {"resolution": series.resolution, "raw_count": series.raw_count}
+    return spec
+
+
+@profiled("render")
+def render_metric_chart(user_id: str, metric: str, start: date, end: date) -> None:
+    """
+    指標の推移グラフをレンダリング
+
+    Args:
+        user_id: ユーザーID
+        metric: CHART_METRICSのキー
+        start: 開始日
+        end: 終了日（この日を含む）
+    """
+    st.markdown(f"**{CHART_METRICS[metric]}**")
+
+    version = get_chart_data_version(user_id, metric, start, end)
+    if version is None:
+        st.warning("データの取得に失敗しました")
+        return
+
+    try:
+        spec = _build_figure_spec(user_id, metric, start, end, version)
+    except DatabaseError:
+        st.warning("データの取得に失敗しました")
+        return
+
+    meta = spec["meta"]
+    if meta["raw_count"] == 0:
+        st.info("この期間の記録はありません")
+        return
+
+    st.plotly_chart(
+        {"data": spec["data"], "layout": spec["layout"]},
+        use_container_width=True,
+        config={"displayModeBar": False},
+    )
+    st.caption(f"{RESOLUTION_LABELS[meta['resolution']]}（記録 {meta['raw_count']}日分）")
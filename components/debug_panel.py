@@ -0,0 +1,64 @@
+"""
+デバッグパネルコンポーネント
+
+プロファイリングモードで、rerunごとの処理時間の内訳を折りたたみパネルに表示する。
+環境変数 MONK_MODE_PROFILE=1、またはURLに ?profile=1 を付けると有効になる。
+
+使用例:
+    start_page_profile("tasks")  # st.set_page_config の直後
+    ...
+    render_profile_panel()       # ページ末尾
+"""
+
+import streamlit as st
+
+from utils.constants import PROFILE_HISTORY_SIZE
+from utils.profiler import (
+    begin_rerun_profile,
+    finish_rerun_profile,
+    is_profiling_enabled_by_env,
+)
+
+
+def start_page_profile(page: str) -> None:
+    """
+    プロファイリングが有効ならrerunの計測を開始
+
+    Args:
+        page: ページ名（cProfileの保存ファイル名にも使用）
+    """
+    if is_profiling_enabled_by_env() or st.query_params.get("profile") == "1":
+        begin_rerun_profile(page)
+
+
+def render_profile_panel() -> None:
+    """
+    rerunの計測を終了し、内訳パネルを表示
+
+    直近PROFILE_HISTORY_SIZE回分のrerunをセッション内に保持して一覧表示する。
+    """
+    profile = finish_rerun_profile()
+    if profile is None:
+        return
+
+    summary = profile.to_dict()
+    history = st.session_state.setdefault("profile_history", [])
+    history.append(summary)
+    del history[:-PROFILE_HISTORY_SIZE]
+
+    with st.expander(f"🐢 プロファイル: {summary['wall_ms']:.0f}ms", expanded=False):
+        col_wall, col_db, col_render, col_other = st.columns(4)
+        col_wall.metric("合計", f"{summary['wall_ms']:.0f}ms")
+        col_db.metric(f"DB（{summary['db_calls']}回）", f"{summary['db_ms']:.0f}ms")
+        col_render.metric("描画", f"{summary['render_ms']:.0f}ms")
+        col_other.metric("その他", f"{summary['other_ms']:.0f}ms")
+
+        if summary["dump_path"]:
+            st.caption(f"cProfile: `{summary['dump_path']}`（snakeviz等で表示）")
+
+        if len(history) > 1:
+            st.dataframe(
+                list(reversed(history)),
+                column_order=("page", "wall_ms", "db_ms", "db_calls", "render_ms", "other_ms"),
+                use_container_width=True,
+            )
@@ -0,0 +1,291 @@
+"""
+習慣記録の入力バッファ
+
+習慣トラッカーの各ウィジェットの変更をセッション状態に溜め、
+変更フィールド（dirty）だけを1回のupsertでまとめて保存する。
+ウィジェットに表示した値から変わったフィールドだけを変更として扱うため、
+記録のない日を開いただけでウィジェットの既定値が保存されることはない。
+
+保存は最後の変更からHABIT_FLUSH_DEBOUNCE_SECONDS秒後に行う（debounce）。
+その間にrerunがなくても、全セッション共通のバックグラウンドスレッドが
+期限に保存するため、入力後すぐにページを離れても変更は失われない。
+セッション状態には予約の受け口（_TrailingFlush）だけを置き、スレッドは持たない。
+
+主要機能:
+- load_habit_records: 期間内の習慣記録を読み込み
+- get_habit_value: 習慣記録の値を取得（未保存の変更を反映）
+- set_habit_field: フィールドの変更を記録
+- flush_habit_changes: 未保存の変更を保存（入力が止まってから、または明示保存）
+- has_unsaved_habit_changes: 未保存の変更があるか
+
+使用例:
+    load_habit_records(user["id"], week_start_str, today_str)
+    sleep = st.slider("睡眠時間", value=get_habit_value(today_str, "sleep_hours", 8.0))
+    set_habit_field(today_str, "sleep_hours", sleep)
+    flush_habit_changes(user["id"])  # ページ末尾で呼ぶ
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import streamlit as st
+
+from utils.constants import HABIT_FIELDS, HABIT_FLUSH_DEBOUNCE_SECONDS
+from utils.database import get_habit_records, upsert_habit_records
+from utils.exceptions import ValidationError
+
+
+class _TrailingFlush:
+    """
+    セッションごとの保存予約
+
+    タイマーは持たず、予約は全セッション共通の_FlushWorkerが期限順に実行する。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._saved: Dict[str, Dict] = {}
+
+    def schedule(self, delay: float, user_id: str, changes: Dict[str, Dict]) -> None:
+        """delay秒後にchangesを保存（保存前に再度呼ばれたら予約し直す）"""
+        _get_flush_worker().schedule(self, time.monotonic() + delay, user_id, changes)
+
+    def cancel(self) -> None:
+        """予約中の保存を取り消す"""
+        _get_flush_worker().cancel(self)
+
+    def save(self, user_id: str, changes: Dict[str, Dict]) -> None:
+        """予約の期限に_FlushWorkerから呼ばれ、保存できた変更を記録する"""
+        if not upsert_habit_records(user_id, changes):
+            return
+        with self._lock:
+            for record_date, fields in changes.items():
+                self._saved.setdefault(record_date, {}).update(fields)
+
+    def pop_saved(self) -> Dict[str, Dict]:
+        """期限に保存済みの変更を取り出す"""
+        with self._lock:
+            saved, self._saved = self._saved, {}
+        return saved
+
+
+class _FlushWorker:
+    """全セッションの保存予約を期限順に実行するバックグラウンドスレッド（プロセス内で1つ）"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending: Dict[_TrailingFlush, Tuple[float, str, Dict[str, Dict]]] = {}
+        self._thread = threading.Thread(target=self._loop, name="monk-mode-habit-flush", daemon=True)
+        self._thread.start()
+
+    def schedule(
+        self, owner: _TrailingFlush, due: float, user_id: str, changes: Dict[str, Dict]
+    ) -> None:
+        """ownerの予約をdue（time.monotonic()基準）に置き換える"""
+        with self._condition:
+            self._pending[owner] = (due, user_id, changes)
+            self._condition.notify()
+
+    def cancel(self, owner: _TrailingFlush) -> None:
+        """ownerの予約を取り消す"""
+        with self._condition:
+            self._pending.pop(owner, None)
+
+    def _loop(self) -> None:
+        while True:
+            with self._condition:
+                if not self._pending:
+                    self._condition.wait()
+                    continue
+                owner, (due, user_id, changes) = min(
+                    self._pending.items(), key=lambda item: item[1][0]
+                )
+                wait = due - time.monotonic()
+                if wait > 0:
+                    # 待機中に予約が追加・変更されたら期限を計算し直す
+                    self._condition.wait(wait)
+                    continue
+                del self._pending[owner]
+
+            owner.save(user_id, changes)
+
+
+_flush_worker: Optional[_FlushWorker] = None
+_flush_worker_lock = threading.Lock()
+
+
+def _get_flush_worker() -> _FlushWorker:
+    """保存予約の実行スレッドを取得（初回呼び出し時に開始）"""
+    global _flush_worker
+
+    with _flush_worker_lock:
+        if _flush_worker is None:
+            _flush_worker = _FlushWorker()
+    return _flush_worker
+
+
+def _initialize_session_state() -> None:
+    """習慣記録用のセッション状態を初期化し、タイマーで保存済みの変更を反映"""
+    if "habits_cache" not in st.session_state:
+        st.session_state["habits_cache"] = {}
+    if "habit_dirty" not in st.session_state:
+        st.session_state["habit_dirty"] = {}
+    if "habit_rendered" not in st.session_state:
+        st.session_state["habit_rendered"] = {}
+    if "habit_last_change_at" not in st.session_state:
+        st.session_state["habit_last_change_at"] = 0.0
+    if "habit_trailing_flush" not in st.session_state:
+        st.session_state["habit_trailing_flush"] = _TrailingFlush()
+
+    saved = st.session_state["habit_trailing_flush"].pop_saved()
+    if saved:
+        _mark_saved(saved)
+
+
+def _mark_saved(saved: Dict[str, Dict]) -> None:
+    """保存済みの変更をキャッシュへ移し、その後変わっていないものを未保存から外す"""
+    cache = st.session_state["habits_cache"]
+    dirty = st.session_state["habit_dirty"]
+
+    for record_date, fields in saved.items():
+        cache[record_date] = {**cache.get(record_date, {}), **fields}
+        pending = dirty.get(record_date, {})
+        for field, value in fields.items():
+            if field in pending and pending[field] == value:
+                del pending[field]
+        if record_date in dirty and not pending:
+            del dirty[record_date]
+
+
+def load_habit_records(user_id: str, start_date: str, end_date: str) -> Dict[str, Dict]:
+    """
+    期間内の習慣記録を1回のクエリで読み込み、セッションにキャッシュ
+
+    Args:
+        user_id: ユーザーID
+        start_date: 開始日（YYYY-MM-DD形式）
+        end_date: 終了日（YYYY-MM-DD形式、この日を含む）
+
+    Returns:
+        日付をキー、習慣記録を値とする辞書（未保存の変更を反映済み）
+    """
+    _initialize_session_state()
+    records = get_habit_records(user_id, start_date, end_date)
+    st.session_state["habits_cache"].update(records)
+
+    for record_date, fields in st.session_state["habit_dirty"].items():
+        if start_date <= record_date <= end_date:
+            records[record_date] = {**records.get(record_date, {}), **fields}
+
+    return records
+
+
+def get_habit_value(record_date: str, field: str, default: Any = None) -> Any:
+    """
+    習慣記録の値を取得
+
+    未保存の変更があればその値を、なければ読み込み済みの値を返す。
+    返した値はウィジェットに表示した値として記録し、set_habit_fieldで
+    変更の有無を判定する基準にする。
+
+    Args:
+        record_date: 記録日（YYYY-MM-DD形式）
+        field: フィールド名
+        default: 値がない場合の既定値
+
+    Returns:
+        フィールドの値
+    """
+    _initialize_session_state()
+    dirty = st.session_state["habit_dirty"].get(record_date, {})
+    if field in dirty:
+        value = dirty[field]
+    else:
+        value = st.session_state["habits_cache"].get(record_date, {}).get(field)
+        value = default if value is None else value
+
+    st.session_state["habit_rendered"].setdefault(record_date, {})[field] = value
+    return value
+
+
+def set_habit_field(record_date: str, field: str, value: Any) -> None:
+    """
+    習慣記録フィールドの変更を記録
+
+    get_habit_value で表示した値のまま（ウィジェットが操作されていない）の場合や、
+    保存済みの値と同じ場合は変更として扱わない。
+
+    Args:
+        record_date: 記録日（YYYY-MM-DD形式）
+        field: フィールド名（HABIT_FIELDSのいずれか）
+        value: 新しい値
+
+    Raises:
+        ValidationError: 更新対象外のフィールドの場合
+    """
+    if field not in HABIT_FIELDS:
+        raise ValidationError(f"更新できないフィールドです: {field}")
+
+    _initialize_session_state()
+    rendered = st.session_state["habit_rendered"].get(record_date, {})
+    if field in rendered and rendered[field] == value:
+        return
+
+    saved = st.session_state["habits_cache"].get(record_date, {})
+    dirty = st.session_state["habit_dirty"]
+    st.session_state["habit_last_change_at"] = time.monotonic()
+
+    if field in saved and saved[field] == value:
+        dirty.get(record_date, {}).pop(field, None)
+        if record_date in dirty and not dirty[record_date]:
+            del dirty[record_date]
+        return
+
+    dirty.setdefault(record_date, {})[field] = value
+
+
+def has_unsaved_habit_changes() -> bool:
+    """
+    未保存の変更があるかチェック
+
+    Returns:
+        未保存の変更があればTrue
+    """
+    return bool(st.session_state.get("habit_dirty"))
+
+
+def flush_habit_changes(user_id: str, force: bool = False) -> bool:
+    """
+    未保存の変更をまとめて保存
+
+    最後の変更からHABIT_FLUSH_DEBOUNCE_SECONDS秒経過していない場合は、
+    入力が止まる時刻に保存するタイマーを予約して戻る（以降の変更で予約し直す）。
+    force=Trueで即時保存する。
+
+    Args:
+        user_id: ユーザーID
+        force: 間隔に関係なく保存するか（保存ボタン用）
+
+    Returns:
+        保存した・予約した、または保存不要の場合True。保存に失敗した場合False。
+    """
+    _initialize_session_state()
+    dirty = st.session_state["habit_dirty"]
+    trailing = st.session_state["habit_trailing_flush"]
+    if not dirty:
+        trailing.cancel()
+        return True
+
+    wait = HABIT_FLUSH_DEBOUNCE_SECONDS - (time.monotonic() - st.session_state["habit_last_change_at"])
+    if not force and wait > 0:
+        snapshot = {record_date: dict(fields) for record_date, fields in dirty.items()}
+        trailing.schedule(wait, user_id, snapshot)
+        return True
+
+    trailing.cancel()
+    if not upsert_habit_records(user_id, dirty):
+        return False
+
+    _mark_saved({record_date: dict(fields) for record_date, fields in dirty.items()})
+    return True
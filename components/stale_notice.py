@@ -0,0 +1,67 @@
+"""
+古いデータの表示通知コンポーネント
+
+DBの応答が遅い・失敗したために前回取得したデータを表示している場合、
+その旨と取得時刻をページ上部に表示する。
+オフライン中に記録した未送信の変更や、送信時に衝突して破棄した変更も通知する。
+
+使用例:
+    result = get_tasks_by_date_with_status(user_id, today_str)
+    render_stale_notice(result)
+    tasks = result.value
+"""
+
+from typing import Dict, List
+
+import streamlit as st
+
+from utils.resilience import ReadResult
+
+
+def render_stale_notice(*results: ReadResult) -> None:
+    """
+    古いデータを表示している場合に通知を表示
+
+    Args:
+        results: ページで使用した読み込み結果
+    """
+    stale = [result for result in results if result.is_stale]
+    if not stale:
+        return
+
+    col_message, col_button = st.columns([5, 1])
+
+    with col_message:
+        if any(result.fetched_at is None for result in stale):
+            st.warning("⚠️ サーバーに接続できないため、一部のデータを表示できません")
+        else:
+            oldest = min(result.fetched_at for result in stale)
+            st.warning(
+                f"⚠️ サーバーの応答が遅いため、{oldest.strftime('%H:%M')}時点のデータを表示しています"
+                "（バックグラウンドで更新中）"
+            )
+
+    with col_button:
+        if st.button("🔄 再読み込み", key="stale_notice_reload", use_container_width=True):
+            st.rerun()
+
+
+def render_offline_notice(pending_count: int, conflicts: List[Dict]) -> None:
+    """
+    未送信のオフライン変更と、衝突により破棄した変更を通知
+
+    Args:
+        pending_count: 未送信の変更の件数
+        conflicts: 衝突により破棄した変更（task_id, op, title, reason）
+    """
+    if pending_count:
+        st.info(f"📴 オフラインで保存した変更が{pending_count}件あります（接続回復後に自動で送信します）")
+
+    for conflict in conflicts:
+        if conflict["reason"] == "deleted":
+            st.warning("⚠️ 他の端末で削除されたタスクへのオフライン中の変更を破棄しました")
+        else:
+            st.warning(
+                f"⚠️ 「{conflict['title']}」は他の端末で更新されていたため、"
+                "オフライン中の変更を破棄しました"
+            )
@@ -5,35 +5,40 @@
 優先度に応じた色分け、完了状態の視覚表現を提供する。
 """
 
-from typing import Optional, Callable, Dict
+from typing import Optional, Callable
 
 import streamlit as st
 
 from utils.constants import PRIORITY_COLORS, PRIORITY_LABELS
+from utils.models import Task
+from utils.profiler import profiled
 
 
+@profiled("render")
 def render_task_card(
-    task: Dict,
+    task: Task,
     on_complete_toggle: Optional[Callable[[str], bool]] = None,
     on_edit: Optional[Callable[[str], None]] = None,
     on_delete: Optional[Callable[[str], None]] = None,
     show_actions: bool = True,
+    focus_minutes: int = 0,
 ) -> None:
     """
     タスクカードをレンダリング
 
     Args:
-        task: タスクデータ（id, title, description, category, priority, is_completed）
+        task: タスク
         on_complete_toggle: 完了切り替え時のコールバック
         on_edit: 編集時のコールバック
         on_delete: 削除時のコールバック
         show_actions: アクションボタンを表示するか
+        focus_minutes: 累計集中時間（分）。0の場合は表示しない。
     """
-    bg_color = PRIORITY_COLORS.get(task["priority"], "#F0F0F0")
-    if task["is_completed"]:
+    bg_color = PRIORITY_COLORS.get(task.priority.value, "#F0F0F0")
+    if task.is_completed:
         bg_color = "#F5F5F5"
 
-    border_color = "#28a745" if task["is_completed"] else "#6c757d"
+    border_color = "#28a745" if task.is_completed else "#6c757d"
 
     with st.container():
         st.markdown(
@@ -53,31 +58,34 @@ def render_task_card(
         with col_check:
             checked = st.checkbox(
                 "完了",
-                value=task["is_completed"],
-                key=f"check_{task['id']}",
+                value=task.is_completed,
+                key=f"check_{task.id}",
                 label_visibility="collapsed",
             )
 
-            if checked != task["is_completed"] and on_complete_toggle:
-                on_complete_toggle(task["id"])
+            if checked != task.is_completed and on_complete_toggle:
+                on_complete_toggle(task.id)
                 st.rerun()
 
         # タスク内容
         with col_content:
-            if task["is_completed"]:
+            if task.is_completed:
                 st.markdown(
                     f"<p style='text-decoration: line-through; color: #999;'>"
-                    f"<strong>{task['title']}</strong></p>",
+                    f"<strong>{task.title}</strong></p>",
                     unsafe_allow_html=True,
                 )
             else:
-                st.markdown(f"**{task['title']}**")
+                st.markdown(f"**{task.title}**")
 
-            if task.get("description"):
-                st.caption(task["description"])
+            if task.description:
+                st.caption(task.description)
 
-            priority_label = PRIORITY_LABELS.get(task["priority"], task["priority"])
-            st.caption(f"🏷️ {task['category']} | 優先度: {priority_label}")
+            priority_label = PRIORITY_LABELS.get(task.priority.value, task.priority.value)
+            meta = f"🏷️ {task.category} | 優先度: {priority_label}"
+            if focus_minutes:
+                meta += f" | ⏱️ {focus_minutes}分"
+            st.caption(meta)
 
         # アクションボタン
         if show_actions:
@@ -85,11 +93,11 @@ def render_task_card(
                 btn_col1, btn_col2 = st.columns(2)
 
                 with btn_col1:
-                    if st.button("✏️", key=f"edit_{task['id']}", help="編集"):
+                    if st.button("✏️", key=f"edit_{task.id}", help="編集"):
                         if on_edit:
-                            on_edit(task["id"])
+                            on_edit(task.id)
 
                 with btn_col2:
-                    if st.button("🗑️", key=f"del_{task['id']}", help="削除"):
+                    if st.button("🗑️", key=f"del_{task.id}", help="削除"):
                         if on_delete:
-                            on_delete(task["id"])
+                            on_delete(task.id)
@@ -0,0 +1,156 @@
+"""
+タスク一覧（表形式）コンポーネント
+
+1日分のタスクをst.data_editorの1つの表として描画する。
+タスクごとにコンテナ・カラム・ボタンを生成するrender_task_cardと異なり、
+描画要素数がタスク数に比例しないため、タスクが多い日でも描画コストと
+送信量が小さく済む。表内の編集はフォームで保持され、保存時に1回でまとめて返る。
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+import streamlit as st
+
+from utils.constants import (
+    TASK_CATEGORIES,
+    TASK_PRIORITIES,
+    PRIORITY_MAP,
+    PRIORITY_LABELS,
+)
+from utils.models import Task
+from utils.profiler import profiled
+
+COLUMN_COMPLETED = "完了"
+COLUMN_TITLE = "タスク名"
+COLUMN_CATEGORY = "カテゴリ"
+COLUMN_PRIORITY = "優先度"
+COLUMN_DESCRIPTION = "説明"
+COLUMN_FOCUS = "集中(分)"
+COLUMN_DELETE = "削除"
+
+
+def _build_frame(tasks: List[Task], focus_by_task: Dict[str, int]) -> pd.DataFrame:
+    """タスクのリストから表示用のDataFrameを作成"""
+    return pd.DataFrame(
+        {
+            COLUMN_COMPLETED: [t.is_completed for t in tasks],
+            COLUMN_TITLE: [t.title for t in tasks],
+            COLUMN_CATEGORY: [t.category for t in tasks],
+            COLUMN_PRIORITY: [PRIORITY_LABELS[t.priority.value] for t in tasks],
+            COLUMN_DESCRIPTION: [t.description or "" for t in tasks],
+            COLUMN_FOCUS: [focus_by_task.get(t.id, 0) for t in tasks],
+            COLUMN_DELETE: [False] * len(tasks),
+        },
+        index=[t.id for t in tasks],
+    )
+
+
+def _diff_tasks(tasks: List[Task], edited: pd.DataFrame) -> Dict[str, List]:
+    """
+    編集前後の差分から更新・削除対象を抽出
+
+    Returns:
+        updates: タスクIDと変更した列だけを含む辞書のリスト
+        deletes: 削除するタスクIDのリスト
+    """
+    updates = []
+    deletes = []
+    now = datetime.now().isoformat()
+
+    for task in tasks:
+        row = edited.loc[task.id]
+        if row[COLUMN_DELETE]:
+            deletes.append(task.id)
+            continue
+
+        title = str(row[COLUMN_TITLE] or "").strip() or task.title
+        changes = {
+            "title": title,
+            "description": str(row[COLUMN_DESCRIPTION] or "").strip(),
+            "category": row[COLUMN_CATEGORY],
+            "priority": PRIORITY_MAP.get(row[COLUMN_PRIORITY], task.priority.value),
+            "is_completed": bool(row[COLUMN_COMPLETED]),
+        }
+
+        unchanged = dict(task.to_row(), description=task.description or "")
+        changes = {
+            field: value for field, value in changes.items() if unchanged[field] != value
+        }
+        if not changes:
+            continue
+
+        if "is_completed" in changes:
+            changes["completed_at"] = now if changes["is_completed"] else None
+
+        updates.append(dict(changes, id=task.id))
+
+    return {"updates": updates, "deletes": deletes}
+
+
+@profiled("render")
+def render_task_table(
+    tasks: List[Task],
+    focus_by_task: Optional[Dict[str, int]] = None,
+    key: str = "task_table",
+) -> Optional[Dict[str, List]]:
+    """
+    タスク一覧を表形式でレンダリング
+
+    表内での完了切り替え・編集・削除チェックはフォーム内に保持され、
+    「変更を保存」を押したときにまとめて返す。保存に失敗しても編集内容が
+    残るよう、表はリセットしない。保存に成功したら reset_task_table を呼ぶこと。
+
+    Args:
+        tasks: タスクのリスト
+        focus_by_task: タスクIDをキーとする累計集中時間（分）
+        key: ウィジェットキー（同一ページに複数置く場合に指定）
+
+    Returns:
+        保存時は {"updates": タスクIDと変更した列の辞書のリスト, "deletes": 削除IDのリスト}。
+        保存されなかった場合はNone。
+    """
+    # 保存後に表の編集状態をリセットするため、保存ごとにキーを変える（reset_task_table）
+    version = st.session_state.get(f"{key}_version", 0)
+
+    with st.form(f"{key}_form_{version}"):
+        edited = st.data_editor(
+            _build_frame(tasks, focus_by_task or {}),
+            key=f"{key}_{version}",
+            hide_index=True,
+            num_rows="fixed",
+            use_container_width=True,
+            disabled=[COLUMN_FOCUS],
+            column_config={
+                COLUMN_COMPLETED: st.column_config.CheckboxColumn(width="small"),
+                COLUMN_TITLE: st.column_config.TextColumn(required=True, max_chars=200),
+                COLUMN_CATEGORY: st.column_config.SelectboxColumn(
+                    options=TASK_CATEGORIES, required=True
+                ),
+                COLUMN_PRIORITY: st.column_config.SelectboxColumn(
+                    options=TASK_PRIORITIES, required=True, width="small"
+                ),
+                COLUMN_DESCRIPTION: st.column_config.TextColumn(),
+                COLUMN_FOCUS: st.column_config.NumberColumn(width="small"),
+                COLUMN_DELETE: st.column_config.CheckboxColumn(width="small"),
+            },
+        )
+
+        submitted = st.form_submit_button("変更を保存", use_container_width=True)
+
+    if not submitted:
+        return None
+
+    return _diff_tasks(tasks, edited)
+
+
+def reset_task_table(key: str = "task_table") -> None:
+    """
+    表の編集状態をリセット（保存に成功した後に呼ぶ）
+
+    Args:
+        key: render_task_tableに指定したウィジェットキー
+    """
+    version_key = f"{key}_version"
+    st.session_state[version_key] = st.session_state.get(version_key, 0) + 1
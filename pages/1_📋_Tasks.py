@@ -9,17 +9,31 @@ from datetime import date
 
 from components.auth import is_authenticated, get_current_user
 from components.task_card import render_task_card
+from components.task_list import render_task_table, reset_task_table
+from components.debug_panel import start_page_profile, render_profile_panel
+from components.stale_notice import render_offline_notice, render_stale_notice
 from utils.database import (
-    get_tasks_by_date,
+    count_offline_task_changes,
+    pop_offline_conflicts,
+    get_tasks_by_date_with_status,
     create_task,
     update_task,
     delete_task,
     toggle_task_completion,
+    bulk_update_tasks,
+    delete_tasks,
+    get_focus_minutes_by_tasks_with_status,
 )
+from utils.models import Priority
+from utils.routine_scheduler import materialize_routine_tasks
+from utils.reminders import ensure_reminder_engine_started
+from utils.scheduler import ensure_scheduler_started
 from utils.constants import (
     TASK_CATEGORIES,
     TASK_PRIORITIES,
     PRIORITY_MAP,
+    TASK_TABLE_AUTO_THRESHOLD,
+    TASK_VIEW_MODES,
     WEEKDAY_LABELS,
 )
 
@@ -28,6 +42,9 @@ st.set_page_config(
     page_icon="📋",
     layout="wide",
 )
+start_page_profile("tasks")
+ensure_scheduler_started()
+ensure_reminder_engine_started()
 
 # 認証チェック
 if not is_authenticated():
@@ -83,11 +100,19 @@ col_filter, _ = st.columns([1, 4])
 with col_filter:
     show_completed = st.checkbox("完了済みを表示", value=True)
 
+# --- ルーティン展開（セッション内で1日1回） ---
+if st.session_state.get("routines_materialized_date") != today_str:
+    materialize_routine_tasks(user["id"], today)
+    st.session_state["routines_materialized_date"] = today_str
+
 # --- タスク取得 ---
-tasks = get_tasks_by_date(user["id"], today_str)
+tasks_result = get_tasks_by_date_with_status(user["id"], today_str)
+tasks = tasks_result.value
+render_stale_notice(tasks_result)
+render_offline_notice(count_offline_task_changes(user["id"]), pop_offline_conflicts(user["id"]))
 
 if not show_completed:
-    tasks = [t for t in tasks if not t["is_completed"]]
+    tasks = [t for t in tasks if not t.is_completed]
 
 # --- タスク一覧表示 ---
 if not tasks:
@@ -95,101 +120,131 @@ if not tasks:
 else:
     st.subheader(f"タスク一覧（{len(tasks)}件）")
 
-    for task in tasks:
-        editing_key = f"editing_{task['id']}"
-        deleting_key = f"deleting_{task['id']}"
+    view_mode = st.radio(
+        "表示形式",
+        TASK_VIEW_MODES,
+        index=1 if len(tasks) > TASK_TABLE_AUTO_THRESHOLD else 0,
+        horizontal=True,
+        key="task_view_mode",
+    )
+
+    # 集中時間は全タスク分を1回で取得
+    focus_result = get_focus_minutes_by_tasks_with_status([t.id for t in tasks])
+    focus_by_task = focus_result.value
+    if not tasks_result.is_stale:
+        render_stale_notice(focus_result)
+
+    # 一覧表示: 表内の変更を保存時にまとめて反映
+    if view_mode == "一覧":
+        changes = render_task_table(tasks, focus_by_task)
+        # 古いデータとの差分は他の端末の変更を打ち消すおそれがあるため保存しない
+        # （編集内容は表に残るため、再読み込み後に保存し直せる）
+        if changes and tasks_result.is_stale:
+            st.error("古いデータを表示中のため保存できません。再読み込みしてください")
+        elif changes:
+            updated = bulk_update_tasks(changes["updates"])
+            deleted = delete_tasks(changes["deletes"])
+            if updated and deleted:
+                reset_task_table()
+                st.rerun()
+            else:
+                st.error("変更の保存に失敗しました")
+
+    # カード表示
+    else:
+        for task in tasks:
+            editing_key = f"editing_{task.id}"
+            deleting_key = f"deleting_{task.id}"
+
+            # 編集モード
+            if st.session_state.get(editing_key):
+                with st.form(f"edit_form_{task.id}"):
+                    new_title = st.text_input(
+                        "タスク名", value=task.title, max_chars=200
+                    )
+                    new_description = st.text_area(
+                        "説明", value=task.description or ""
+                    )
 
-        # 編集モード
-        if st.session_state.get(editing_key):
-            with st.form(f"edit_form_{task['id']}"):
-                new_title = st.text_input(
-                    "タスク名", value=task["title"], max_chars=200
-                )
-                new_description = st.text_area(
-                    "説明", value=task.get("description", "")
-                )
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        current_cat_index = (
+                            TASK_CATEGORIES.index(task.category)
+                            if task.category in TASK_CATEGORIES
+                            else 0
+                        )
+                        new_category = st.selectbox(
+                            "カテゴリ",
+                            TASK_CATEGORIES,
+                            index=current_cat_index,
+                            key=f"edit_cat_{task.id}",
+                        )
+                    with col2:
+                        current_pri_index = list(Priority).index(task.priority)
+                        new_priority_display = st.selectbox(
+                            "優先度",
+                            TASK_PRIORITIES,
+                            index=current_pri_index,
+                            key=f"edit_pri_{task.id}",
+                        )
+                        new_priority = PRIORITY_MAP[new_priority_display]
+
+                    col_save, col_cancel = st.columns(2)
+                    with col_save:
+                        if st.form_submit_button("保存", use_container_width=True):
+                            updates = {
+                                "title": new_title.strip(),
+                                "description": new_description.strip(),
+                                "category": new_category,
+                                "priority": new_priority,
+                            }
+                            if update_task(task.id, updates):
+                                st.success("タスクを更新しました")
+                                del st.session_state[editing_key]
+                                st.rerun()
+                            else:
+                                st.error("更新に失敗しました")
+
+                    with col_cancel:
+                        if st.form_submit_button("キャンセル", use_container_width=True):
+                            del st.session_state[editing_key]
+                            st.rerun()
 
+            # 削除確認
+            elif st.session_state.get(deleting_key):
+                st.warning(f"「{task.title}」を削除しますか？")
                 col1, col2 = st.columns(2)
                 with col1:
-                    current_cat_index = (
-                        TASK_CATEGORIES.index(task["category"])
-                        if task["category"] in TASK_CATEGORIES
-                        else 0
-                    )
-                    new_category = st.selectbox(
-                        "カテゴリ",
-                        TASK_CATEGORIES,
-                        index=current_cat_index,
-                        key=f"edit_cat_{task['id']}",
-                    )
-                with col2:
-                    priority_values = ["high", "medium", "low"]
-                    current_pri_index = (
-                        priority_values.index(task["priority"])
-                        if task["priority"] in priority_values
-                        else 1
-                    )
-                    new_priority_display = st.selectbox(
-                        "優先度",
-                        TASK_PRIORITIES,
-                        index=current_pri_index,
-                        key=f"edit_pri_{task['id']}",
-                    )
-                    new_priority = PRIORITY_MAP[new_priority_display]
-
-                col_save, col_cancel = st.columns(2)
-                with col_save:
-                    if st.form_submit_button("保存", use_container_width=True):
-                        updates = {
-                            "title": new_title.strip(),
-                            "description": new_description.strip(),
-                            "category": new_category,
-                            "priority": new_priority,
-                        }
-                        if update_task(task["id"], updates):
-                            st.success("タスクを更新しました")
-                            del st.session_state[editing_key]
+                    if st.button(
+                        "削除する",
+                        key=f"confirm_del_{task.id}",
+                        type="primary",
+                    ):
+                        if delete_task(task.id):
+                            st.success("タスクを削除しました")
+                            del st.session_state[deleting_key]
                             st.rerun()
                         else:
-                            st.error("更新に失敗しました")
-
-                with col_cancel:
-                    if st.form_submit_button("キャンセル", use_container_width=True):
-                        del st.session_state[editing_key]
-                        st.rerun()
-
-        # 削除確認
-        elif st.session_state.get(deleting_key):
-            st.warning(f"「{task['title']}」を削除しますか？")
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button(
-                    "削除する",
-                    key=f"confirm_del_{task['id']}",
-                    type="primary",
-                ):
-                    if delete_task(task["id"]):
-                        st.success("タスクを削除しました")
+                            st.error("削除に失敗しました")
+                with col2:
+                    if st.button("キャンセル", key=f"cancel_del_{task.id}"):
                         del st.session_state[deleting_key]
                         st.rerun()
-                    else:
-                        st.error("削除に失敗しました")
-            with col2:
-                if st.button("キャンセル", key=f"cancel_del_{task['id']}"):
-                    del st.session_state[deleting_key]
-                    st.rerun()
-
-        # 通常表示
-        else:
-            def _on_edit(task_id: str) -> None:
-                st.session_state[f"editing_{task_id}"] = True
 
-            def _on_delete(task_id: str) -> None:
-                st.session_state[f"deleting_{task_id}"] = True
+            # 通常表示
+            else:
+                def _on_edit(task_id: str) -> None:
+                    st.session_state[f"editing_{task_id}"] = True
+
+                def _on_delete(task_id: str) -> None:
+                    st.session_state[f"deleting_{task_id}"] = True
+
+                render_task_card(
+                    task,
+                    on_complete_toggle=toggle_task_completion,
+                    on_edit=_on_edit,
+                    on_delete=_on_delete,
+                    focus_minutes=focus_by_task.get(task.id, 0),
+                )
 
-            render_task_card(
-                task,
-                on_complete_toggle=toggle_task_completion,
-                on_edit=_on_edit,
-                on_delete=_on_delete,
-            )
+render_profile_panel()
@@ -0,0 +1,161 @@
+"""
+習慣トラッカーページ
+
+日々の習慣（睡眠・運動・禁止事項など）を記録し、今週の達成状況を表示する。
+入力はセッションに溜めて、入力が止まってから変更フィールドだけをまとめて保存する。
+"""
+
+import streamlit as st
+from datetime import date, timedelta
+
+from components.auth import is_authenticated, get_current_user
+from components.debug_panel import start_page_profile, render_profile_panel
+from components.habit_tracker import (
+    load_habit_records,
+    get_habit_value,
+    set_habit_field,
+    flush_habit_changes,
+    has_unsaved_habit_changes,
+)
+from utils.constants import (
+    DEFAULT_SLEEP_HOURS,
+    HABIT_CHECK_FIELDS,
+    HABIT_CHECK_LABELS,
+    HABIT_FLUSH_DEBOUNCE_SECONDS,
+    MAX_SCREEN_TIME_MINUTES,
+    MAX_SLEEP_HOURS,
+    MIN_SLEEP_HOURS,
+    WEEKDAY_LABELS,
+)
+
+st.set_page_config(
+    page_title="習慣トラッカー",
+    page_icon="📊",
+    layout="wide",
+)
+start_page_profile("habits")
+
+# 認証チェック
+if not is_authenticated():
+    st.switch_page("pages/0_🔐_Auth.py")
+
+user = get_current_user()
+today = date.today()
+week_start = today - timedelta(days=today.weekday())
+
+st.title("📊 習慣トラッカー")
+
+record_day = st.date_input("記録日", value=today, max_value=today)
+day_str = record_day.isoformat()
+
+# 今週分と記録日を1回のクエリで読み込む
+records = load_habit_records(user["id"], min(record_day, week_start).isoformat(), today.isoformat())
+
+st.divider()
+
+# --- 記録入力 ---
+# ウィジェットのキーに日付を含め、記録日を切り替えたら値を読み直す
+st.subheader(f"{record_day.strftime('%m月%d日')}（{WEEKDAY_LABELS[record_day.weekday()]}）の習慣")
+
+col_body, col_checks = st.columns(2)
+with col_body:
+    sleep_hours = st.slider(
+        "😴 睡眠時間（時間）",
+        min_value=float(MIN_SLEEP_HOURS),
+        max_value=float(MAX_SLEEP_HOURS),
+        value=float(get_habit_value(day_str, "sleep_hours", DEFAULT_SLEEP_HOURS)),
+        step=0.5,
+        key=f"habit_sleep_hours_{day_str}",
+    )
+    set_habit_field(day_str, "sleep_hours", sleep_hours)
+
+    reading_minutes = st.number_input(
+        "📖 読書（分）",
+        min_value=0,
+        value=int(get_habit_value(day_str, "reading_minutes", 0)),
+        step=5,
+        key=f"habit_reading_minutes_{day_str}",
+    )
+    set_habit_field(day_str, "reading_minutes", reading_minutes)
+
+    water_intake = st.number_input(
+        "💧 水分摂取量（L）",
+        min_value=0.0,
+        max_value=10.0,
+        value=float(get_habit_value(day_str, "water_intake_liters", 0.0)),
+        step=0.1,
+        key=f"habit_water_intake_liters_{day_str}",
+    )
+    set_habit_field(day_str, "water_intake_liters", round(water_intake, 1))
+
+    screen_time = st.number_input(
+        "📱 スクリーンタイム（分）",
+        min_value=0,
+        value=int(get_habit_value(day_str, "screen_time_minutes", 0)),
+        step=10,
+        help=f"目標: {MAX_SCREEN_TIME_MINUTES}分以内",
+        key=f"habit_screen_time_minutes_{day_str}",
+    )
+    set_habit_field(day_str, "screen_time_minutes", screen_time)
+
+with col_checks:
+    for field in HABIT_CHECK_FIELDS:
+        # 禁止事項は達成（守れた）を既定にする（DBの既定値と同じ）
+        default = field.startswith("no_")
+        checked = st.checkbox(
+            HABIT_CHECK_LABELS[field],
+            value=bool(get_habit_value(day_str, field, default)),
+            key=f"habit_{field}_{day_str}",
+        )
+        set_habit_field(day_str, field, checked)
+
+mood = st.select_slider(
+    "🙂 気分",
+    options=[1, 2, 3, 4, 5],
+    value=get_habit_value(day_str, "mood_rating", 3),
+    key=f"habit_mood_rating_{day_str}",
+)
+set_habit_field(day_str, "mood_rating", mood)
+
+notes = st.text_area(
+    "📝 メモ",
+    value=get_habit_value(day_str, "notes", ""),
+    key=f"habit_notes_{day_str}",
+)
+set_habit_field(day_str, "notes", notes)
+
+col_save, col_status = st.columns([1, 4])
+with col_save:
+    if st.button("保存", type="primary", use_container_width=True):
+        if flush_habit_changes(user["id"], force=True):
+            st.success("保存しました")
+        else:
+            st.error("保存に失敗しました")
+with col_status:
+    if has_unsaved_habit_changes():
+        st.caption(f"未保存の変更があります（入力が止まると{HABIT_FLUSH_DEBOUNCE_SECONDS}秒後に自動保存されます）")
+
+st.divider()
+
+# --- 今週の達成状況 ---
+st.subheader("今週の達成状況")
+
+week_rows = []
+for offset in range((today - week_start).days + 1):
+    day = week_start + timedelta(days=offset)
+    record = records.get(day.isoformat())
+    week_rows.append({
+        "日付": f"{day.strftime('%m/%d')}（{WEEKDAY_LABELS[day.weekday()]}）",
+        "睡眠（時間）": record.get("sleep_hours") if record else None,
+        "達成": (
+            f"{sum(1 for field in HABIT_CHECK_FIELDS if record.get(field))}/{len(HABIT_CHECK_FIELDS)}"
+            if record else "未記録"
+        ),
+        "スクリーンタイム（分）": record.get("screen_time_minutes") if record else None,
+    })
+st.dataframe(week_rows, hide_index=True, use_container_width=True)
+
+# 入力が止まってから保存する（最後の変更から間もない場合は保存を予約する）
+flush_habit_changes(user["id"])
+
+render_profile_panel()
@@ -0,0 +1,48 @@
+"""
+統計・分析ページ
+
+睡眠時間・スクリーンタイム・タスク完了率の推移をグラフで表示する。
+長い期間は週平均・月平均に間引き、グラフはデータが変わるまでキャッシュする。
+"""
+
+import streamlit as st
+from datetime import date, timedelta
+
+from components.auth import is_authenticated, get_current_user
+from components.chart_widgets import render_metric_chart
+from components.debug_panel import start_page_profile, render_profile_panel
+from utils.chart_data import get_first_record_date
+from utils.constants import CHART_METRICS, CHART_RANGES
+
+st.set_page_config(
+    page_title="統計・分析",
+    page_icon="📈",
+    layout="wide",
+)
+start_page_profile("analytics")
+
+# 認証チェック
+if not is_authenticated():
+    st.switch_page("pages/0_🔐_Auth.py")
+
+user = get_current_user()
+today = date.today()
+
+st.title("📈 統計・分析")
+
+# --- 期間選択 ---
+range_label = st.radio("表示期間", list(CHART_RANGES), index=1, horizontal=True)
+range_days = CHART_RANGES[range_label]
+
+st.divider()
+
+# --- 推移グラフ ---
+for metric in CHART_METRICS:
+    if range_days is None:
+        start = get_first_record_date(user["id"], metric) or today
+    else:
+        start = today - timedelta(days=range_days - 1)
+
+    render_metric_chart(user["id"], metric, start, today)
+
+render_profile_panel()
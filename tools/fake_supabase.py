@@ -0,0 +1,309 @@
+"""
+負荷試験用のインメモリSupabaseクライアント
+
+アプリが使用するクエリビルダー（table/select/eq/order/insert/upsert等）と
+Auth APIの一部をメモリ上で再現する。各リクエストには指定した遅延を挿入し、
+ネットワーク越しのSupabaseに近い待ち時間を再現する。
+
+使用例:
+    fake = FakeSupabase(latency_ms=30)
+    install_fake_supabase(fake)  # アプリのモジュールをimportする前に呼ぶ
+"""
+
+import random
+import sys
+import threading
+import time
+import types
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# テーブルごとの既定値（DB側のDEFAULTに相当）
+TABLE_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "daily_tasks": {
+        "description": None,
+        "category": None,
+        "priority": "medium",
+        "is_completed": False,
+        "completed_at": None,
+        "display_order": 0,
+        "routine_id": None,
+    },
+    "pomodoro_sessions": {"task_id": None, "ended_at": None, "completed": False},
+}
+
+
+class FakeResponse:
+    """postgrestのAPIResponse相当"""
+
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """postgrestのクエリビルダー相当"""
+
+    def __init__(self, backend: "FakeSupabase", table: str):
+        self._backend = backend
+        self._table = table
+        self._action = "select"
+        self._payload: Any = None
+        self._columns: Optional[List[str]] = None
+        self._filters: List[Callable[[Dict], bool]] = []
+        self._orders: List[Tuple[str, bool]] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._single = False
+        self._on_conflict: Optional[List[str]] = None
+        self._ignore_duplicates = False
+
+    # --- 操作 ---
+    def select(self, columns: str = "*", **_kwargs) -> "FakeQuery":
+        self._action = "select"
+        if columns.strip() != "*":
+            self._columns = [c.strip() for c in columns.split(",")]
+        return self
+
+    def insert(self, payload: Any, **_kwargs) -> "FakeQuery":
+        self._action, self._payload = "insert", payload
+        return self
+
+    def upsert(
+        self,
+        payload: Any,
+        on_conflict: str = "",
+        ignore_duplicates: bool = False,
+        **_kwargs,
+    ) -> "FakeQuery":
+        self._action, self._payload = "upsert", payload
+        self._on_conflict = [c.strip() for c in on_conflict.split(",") if c.strip()] or ["id"]
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, payload: Dict, **_kwargs) -> "FakeQuery":
+        self._action, self._payload = "update", payload
+        return self
+
+    def delete(self, **_kwargs) -> "FakeQuery":
+        self._action = "delete"
+        return self
+
+    # --- フィルタ ---
+    def eq(self, column: str, value: Any) -> "FakeQuery":
+        self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column: str, value: Any) -> "FakeQuery":
+        self._filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def gt(self, column: str, value: Any) -> "FakeQuery":
+        self._filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def gte(self, column: str, value: Any) -> "FakeQuery":
+        self._filters.append(lambda row: row.get(column) is not None and row[column] >= value)
+        return self
+
+    def lt(self, column: str, value: Any) -> "FakeQuery":
+        self._filters.append(lambda row: row.get(column) is not None and row[column] < value)
+        return self
+
+    def lte(self, column: str, value: Any) -> "FakeQuery":
+        self._filters.append(lambda row: row.get(column) is not None and row[column] <= value)
+        return self
+
+    def in_(self, column: str, values: List[Any]) -> "FakeQuery":
+        value_set = set(values)
+        self._filters.append(lambda row: row.get(column) in value_set)
+        return self
+
+    def ilike(self, column: str, pattern: str) -> "FakeQuery":
+        needle = pattern.strip("%").lower()
+        self._filters.append(lambda row: needle in str(row.get(column) or "").lower())
+        return self
+
+    def order(self, column: str, desc: bool = False, **_kwargs) -> "FakeQuery":
+        self._orders.append((column, desc))
+        return self
+
+    def limit(self, count: int, **_kwargs) -> "FakeQuery":
+        self._limit = count
+        return self
+
+    def range(self, start: int, end: int, **_kwargs) -> "FakeQuery":
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def single(self) -> "FakeQuery":
+        self._single = True
+        return self
+
+    # --- 実行 ---
+    def execute(self) -> FakeResponse:
+        self._backend.simulate_latency()
+        with self._backend.lock:
+            return self._execute_locked()
+
+    def _matches(self, row: Dict) -> bool:
+        return all(condition(row) for condition in self._filters)
+
+    def _project(self, row: Dict) -> Dict:
+        if self._columns is None:
+            return dict(row)
+        return {column: row.get(column) for column in self._columns}
+
+    def _execute_locked(self) -> FakeResponse:
+        rows = self._backend.tables.setdefault(self._table, [])
+
+        if self._action == "select":
+            result = [row for row in rows if self._matches(row)]
+            for column, desc in reversed(self._orders):
+                result.sort(
+                    key=lambda row: (row.get(column) is None, row.get(column)),
+                    reverse=desc,
+                )
+            result = result[self._offset:]
+            if self._limit is not None:
+                result = result[:self._limit]
+            result = [self._project(row) for row in result]
+            if self._single:
+                if len(result) != 1:
+                    raise RuntimeError(f"single() expected 1 row, got {len(result)}")
+                return FakeResponse(result[0])
+            return FakeResponse(result)
+
+        if self._action == "insert":
+            payload = self._payload if isinstance(self._payload, list) else [self._payload]
+            created = [self._backend.new_row(self._table, item) for item in payload]
+            rows.extend(created)
+            return FakeResponse([dict(row) for row in created])
+
+        if self._action == "upsert":
+            payload = self._payload if isinstance(self._payload, list) else [self._payload]
+            written = []
+            for item in payload:
+                key = tuple(item.get(column) for column in self._on_conflict)
+                existing = next(
+                    (row for row in rows
+                     if tuple(row.get(column) for column in self._on_conflict) == key),
+                    None,
+                )
+                if existing is None:
+                    row = self._backend.new_row(self._table, item)
+                    rows.append(row)
+                    written.append(dict(row))
+                elif not self._ignore_duplicates:
+                    existing.update(item)
+                    written.append(dict(existing))
+            return FakeResponse(written)
+
+        if self._action == "update":
+            updated = []
+            for row in rows:
+                if self._matches(row):
+                    row.update(self._payload)
+                    updated.append(dict(row))
+            return FakeResponse(updated)
+
+        if self._action == "delete":
+            deleted = [row for row in rows if self._matches(row)]
+            self._backend.tables[self._table] = [row for row in rows if not self._matches(row)]
+            return FakeResponse(deleted)
+
+        raise ValueError(f"Unsupported action: {self._action}")
+
+
+class FakeRpc:
+    """rpc()呼び出し相当（結果は常に空）"""
+
+    def __init__(self, backend: "FakeSupabase"):
+        self._backend = backend
+
+    def execute(self) -> FakeResponse:
+        self._backend.simulate_latency()
+        return FakeResponse([])
+
+
+class FakeAuth:
+    """Supabase Auth相当（任意のメール/パスワードでログイン可能）"""
+
+    def __init__(self, backend: "FakeSupabase"):
+        self._backend = backend
+
+    def _user_for(self, email: str, display_name: str = "") -> types.SimpleNamespace:
+        user_id = str(uuid.uuid5(uuid.NAMESPACE_URL, email))
+        with self._backend.lock:
+            profiles = self._backend.tables.setdefault("user_profiles", [])
+            if not any(profile["id"] == user_id for profile in profiles):
+                profiles.append({"id": user_id, "display_name": display_name or email.split("@")[0]})
+        return types.SimpleNamespace(user=types.SimpleNamespace(id=user_id, email=email))
+
+    def sign_in_with_password(self, credentials: Dict) -> types.SimpleNamespace:
+        self._backend.simulate_latency()
+        return self._user_for(credentials["email"])
+
+    def sign_up(self, credentials: Dict) -> types.SimpleNamespace:
+        self._backend.simulate_latency()
+        display_name = credentials.get("options", {}).get("data", {}).get("display_name", "")
+        return self._user_for(credentials["email"], display_name)
+
+    def sign_out(self) -> None:
+        self._backend.simulate_latency()
+
+
+class FakeSupabase:
+    """
+    インメモリSupabaseクライアント
+
+    Args:
+        latency_ms: 1リクエストあたりの平均遅延（ミリ秒）
+        jitter_ms: 遅延のばらつき（標準偏差、ミリ秒）
+    """
+
+    def __init__(self, latency_ms: float = 30.0, jitter_ms: float = 10.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tables: Dict[str, List[Dict]] = {}
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.auth = FakeAuth(self)
+
+    def simulate_latency(self) -> None:
+        """1リクエスト分の遅延を挿入"""
+        with self.lock:
+            self.request_count += 1
+        delay_ms = max(random.gauss(self.latency_ms, self.jitter_ms), 0.0)
+        time.sleep(delay_ms / 1000)
+
+    def new_row(self, table: str, item: Dict) -> Dict:
+        """既定値・id・タイムスタンプを補完した新規行を作成"""
+        now = datetime.now(timezone.utc).isoformat()
+        row = dict(TABLE_DEFAULTS.get(table, {}))
+        row.update({"id": str(uuid.uuid4()), "created_at": now, "updated_at": now})
+        row.update(item)
+        return row
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, _name: str, _params: Optional[Dict] = None) -> FakeRpc:
+        return FakeRpc(self)
+
+
+def install_fake_supabase(fake: FakeSupabase) -> None:
+    """
+    utils.supabase_client を偽クライアントに差し替える
+
+    アプリのモジュールがimportされる前に呼ぶこと。
+    """
+    module = types.ModuleType("utils.supabase_client")
+    module.SUPABASE_URL = "http://fake-supabase.local"
+    module.SUPABASE_KEY = "fake"
+    # バックグラウンドジョブは負荷試験の対象外のため起動させない
+    module.SUPABASE_SERVICE_ROLE_KEY = None
+    module.supabase = fake
+    module.get_admin_client = lambda: fake
+    sys.modules["utils.supabase_client"] = module
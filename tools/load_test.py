@@ -0,0 +1,387 @@
+"""
+同時接続負荷試験ハーネス
+
+streamlit.testing の AppTest で N 個のセッションを並行に動かし、
+1プロセスで何人まで同時に捌けるかを計測する。バックエンドは遅延を挿入した
+インメモリSupabase（tools/fake_supabase.py）を使用するため、外部サービスは不要。
+
+各セッションのシナリオ:
+    ログイン → Home表示 → タスク追加 → 完了切り替え → 編集 → 削除
+
+タスク追加だけはフォームを送信せず、バックエンドに登録してページを再読み込みする。
+追加フォームは送信後にst.rerun()するが、AppTest（streamlit 1.31）はスクリプト内の
+rerunで送信ボタンのトリガーを消さないため、送信すると追加がタイムアウトまで
+繰り返されるため。また、スクリプト内のrerunで中断された回の要素も結果に残り、
+rerun後に消えたウィジェット（編集フォーム・削除確認）があると次の実行が
+失敗するため、保存・削除の後はページを開き直す。
+
+計測項目（同時セッション数ごと）:
+- rerunレイテンシのp50/p95/p99
+- スループット（rerun/秒）
+- 1セッションあたりのメモリ使用量（tracemalloc）
+- 飽和点（スループットが伸びなくなる、またはp95が予算を超える同時数）
+
+tracemallocは全メモリ確保をフックして処理を大きく遅くするため、レイテンシと
+スループットはトレースを止めた状態で計測し、メモリは同じシナリオを
+もう一度トレースを有効にして実行する別のパスで計測する（--skip-memoryで省略）。
+
+使用例:
+    python -m tools.load_test --levels 1,2,4,8,16 --latency-ms 30 --iterations 2
+"""
+
+import argparse
+import logging
+import statistics
+import threading
+import time
+import tracemalloc
+import types
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from tools.fake_supabase import FakeSupabase, install_fake_supabase
+from utils.constants import TASK_CATEGORIES
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+AUTH_PAGE = str(ROOT_DIR / "pages" / "0_🔐_Auth.py")
+HOME_PAGE = str(ROOT_DIR / "Home.py")
+TASKS_PAGE = str(ROOT_DIR / "pages" / "1_📋_Tasks.py")
+
+# AppTestの1回のrunのタイムアウト（高負荷時に打ち切られないよう長めに取る）
+RUN_TIMEOUT_SECONDS = 120
+
+# 飽和判定: スループットの伸びがこの割合未満になったら飽和とみなす
+SATURATION_GAIN_THRESHOLD = 0.10
+
+
+class SessionMetrics:
+    """1セッション分の計測結果"""
+
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.errors: List[str] = []
+
+
+def _timed_run(app, metrics: SessionMetrics) -> None:
+    """AppTestを1回実行し、レイテンシと例外を記録"""
+    started = time.perf_counter()
+    app.run(timeout=RUN_TIMEOUT_SECONDS)
+    metrics.latencies_ms.append((time.perf_counter() - started) * 1000)
+    for exception in app.exception:
+        # ページ遷移（st.switch_page）はAppTestでは解決できないため除外する
+        if "switch_page" not in exception.value and "Could not find page" not in exception.value:
+            metrics.errors.append(exception.value)
+
+
+def share_test_runtime() -> None:
+    """
+    複数スレッドでAppTestを同時に実行できるようにする
+
+    AppTest（streamlit 1.31）は実行ごとにモックのRuntimeをクラス変数に設定し、
+    終了時にNoneへ戻すため、同時に実行すると他のセッションの実行中にRuntimeが
+    消える（"Runtime hasn't been created!"）。共有のモックを1つ設定し、
+    AppTestからの設定・解除はそのモックに影響しないようにする。
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import app_test
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    app_test.Runtime = types.SimpleNamespace(_instance=runtime)
+
+
+def _open_page(path: str, user: Dict):
+    """ログイン済みのセッション状態でページのAppTestを作成"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(path, default_timeout=RUN_TIMEOUT_SECONDS)
+    app.session_state["user"] = user
+    app.session_state["authenticated"] = True
+    return app
+
+
+def _timed_run_until(app, metrics: SessionMetrics, shown: Callable[[], bool]) -> None:
+    """
+    AppTestを実行し、表示されていなければもう1回実行
+
+    カードの編集・削除ボタンはクリックされた回のカード描画後にセッション状態を
+    変えるため、編集フォーム・削除確認は次のrerunで表示される。
+    """
+    _timed_run(app, metrics)
+    if not shown():
+        _timed_run(app, metrics)
+
+
+def _find_by_key_prefix(elements, prefix: str):
+    """キーが指定の接頭辞で始まる最初の要素を取得"""
+    for element in elements:
+        if element.key and element.key.startswith(prefix):
+            return element
+    return None
+
+
+def _find_button(app, label: str):
+    """ラベルでボタンを取得"""
+    for button in app.button:
+        if button.label == label:
+            return button
+    return None
+
+
+def run_session(session_no: int, iterations: int, fake: FakeSupabase) -> SessionMetrics:
+    """
+    1ユーザー分のシナリオを実行
+
+    Args:
+        session_no: セッション番号（ユーザーの識別に使用）
+        iterations: タスク操作（追加〜削除）の繰り返し回数
+        fake: 偽バックエンド（タスクの登録に使用）
+
+    Returns:
+        計測結果
+    """
+    from streamlit.testing.v1 import AppTest
+
+    metrics = SessionMetrics()
+
+    # ログイン
+    auth = AppTest.from_file(AUTH_PAGE, default_timeout=RUN_TIMEOUT_SECONDS)
+    _timed_run(auth, metrics)
+    auth.text_input(key="login_email").input(f"load-{session_no}@example.com")
+    auth.text_input(key="login_password").input("password123")
+    _find_button(auth, "ログイン").click()
+    _timed_run(auth, metrics)
+
+    if not auth.session_state["authenticated"]:
+        metrics.errors.append("login failed")
+        return metrics
+    user = auth.session_state["user"]
+
+    # Home表示
+    _timed_run(_open_page(HOME_PAGE, user), metrics)
+
+    tasks = _open_page(TASKS_PAGE, user)
+    _timed_run(tasks, metrics)
+
+    for iteration in range(iterations):
+        # タスク追加（フォーム送信の代わりに登録して再読み込み。モジュールdocstring参照）
+        fake.table("daily_tasks").insert({
+            "user_id": user["id"],
+            "title": f"負荷試験タスク {session_no}-{iteration}",
+            "category": TASK_CATEGORIES[0],
+            "task_date": date.today().isoformat(),
+        }).execute()
+        _timed_run(tasks, metrics)
+
+        checkbox = _find_by_key_prefix(tasks.checkbox, "check_")
+        if checkbox is None:
+            metrics.errors.append("task was not created")
+            continue
+        task_id = checkbox.key[len("check_"):]
+
+        # 完了切り替え
+        checkbox.check()
+        _timed_run(tasks, metrics)
+
+        # 編集（保存後は編集フォームが消えるため開き直す）
+        edit_button = _find_by_key_prefix(tasks.button, f"edit_{task_id}")
+        if edit_button is None:
+            # 読み込みが待ち時間上限を超え、追加前の古い一覧が表示された場合
+            metrics.errors.append("task was not shown")
+            continue
+        edit_button.click()
+        _timed_run_until(tasks, metrics, lambda: _find_button(tasks, "保存") is not None)
+        save_button = _find_button(tasks, "保存")
+        if save_button is not None:
+            save_button.click()
+            _timed_run(tasks, metrics)
+            tasks = _open_page(TASKS_PAGE, user)
+            _timed_run(tasks, metrics)
+
+        # 削除（削除後は確認ボタンが消えるため開き直す）
+        delete_button = _find_by_key_prefix(tasks.button, f"del_{task_id}")
+        if delete_button is None:
+            metrics.errors.append("task was not shown")
+            continue
+        delete_button.click()
+        confirm_key = f"confirm_del_{task_id}"
+        _timed_run_until(tasks, metrics, lambda: _find_by_key_prefix(tasks.button, confirm_key) is not None)
+        confirm_button = _find_by_key_prefix(tasks.button, confirm_key)
+        if confirm_button is None:
+            metrics.errors.append("delete confirmation was not shown")
+            continue
+        confirm_button.click()
+        _timed_run(tasks, metrics)
+        tasks = _open_page(TASKS_PAGE, user)
+        _timed_run(tasks, metrics)
+
+    return metrics
+
+
+def _percentile(sorted_values: List[float], ratio: float) -> float:
+    """ソート済みリストのパーセンタイル（最近傍法）"""
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(ratio * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _run_sessions(
+    concurrency: int, iterations: int, fake: FakeSupabase
+) -> Tuple[List[SessionMetrics], float]:
+    """同時数分のセッションを一斉に開始して実行（経過秒数も返す）"""
+    barrier = threading.Barrier(concurrency)
+
+    def _worker(session_no: int) -> SessionMetrics:
+        barrier.wait()
+        return run_session(session_no, iterations, fake)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(_worker, range(concurrency)))
+    return results, time.perf_counter() - started
+
+
+def measure_memory(concurrency: int, iterations: int, fake: FakeSupabase) -> float:
+    """
+    トレースを有効にしてシナリオを実行し、1セッションあたりのメモリ使用量を計測
+
+    Returns:
+        1セッションあたりのピーク時の増加量（KB）
+    """
+    tracemalloc.start()
+    try:
+        memory_before, _ = tracemalloc.get_traced_memory()
+        _run_sessions(concurrency, iterations, fake)
+        _, memory_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (memory_peak - memory_before) / concurrency / 1024
+
+
+def run_level(
+    concurrency: int, iterations: int, fake: FakeSupabase, with_memory: bool = True
+) -> Dict:
+    """
+    指定した同時セッション数で負荷をかける
+
+    レイテンシ・スループットはトレースなしで計測し、メモリは別のパスで計測する。
+
+    Args:
+        concurrency: 同時セッション数
+        iterations: 各セッションのタスク操作回数
+        fake: 偽バックエンド（リクエスト数の集計に使用）
+        with_memory: メモリ計測のパスを実行するか
+
+    Returns:
+        同時数ごとの集計結果
+    """
+    requests_before = fake.request_count
+    results, elapsed = _run_sessions(concurrency, iterations, fake)
+    backend_requests = fake.request_count - requests_before
+
+    memory_per_session_kb = measure_memory(concurrency, iterations, fake) if with_memory else None
+
+    latencies = sorted(ms for result in results for ms in result.latencies_ms)
+    errors = [error for result in results for error in result.errors]
+
+    return {
+        "concurrency": concurrency,
+        "reruns": len(latencies),
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": _percentile(latencies, 0.50),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+        "mean_ms": statistics.mean(latencies) if latencies else 0.0,
+        "memory_per_session_kb": memory_per_session_kb,
+        "backend_requests": backend_requests,
+        "errors": errors,
+    }
+
+
+def find_saturation_point(results: List[Dict], p95_budget_ms: float) -> Optional[int]:
+    """
+    飽和点（これ以上同時数を増やしても得がない同時数）を判定
+
+    スループットの伸びがSATURATION_GAIN_THRESHOLD未満になった、
+    またはp95が予算を超えた直前の同時数を返す。
+
+    Returns:
+        飽和点の同時数。計測範囲内で飽和しなかった場合はNone。
+    """
+    for previous, current in zip(results, results[1:]):
+        gain = (current["throughput"] - previous["throughput"]) / max(previous["throughput"], 1e-9)
+        if gain < SATURATION_GAIN_THRESHOLD or current["p95_ms"] > p95_budget_ms:
+            return previous["concurrency"]
+    return None
+
+
+def print_report(results: List[Dict], p95_budget_ms: float) -> None:
+    """集計結果を表形式で表示"""
+    print()
+    print(f"{'N':>4} {'reruns':>7} {'rerun/s':>8} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8} "
+          f"{'KB/sess':>9} {'DB req':>7} {'errors':>6}")
+    for result in results:
+        memory = result["memory_per_session_kb"]
+        memory_text = "-" if memory is None else f"{memory:.0f}"
+        print(
+            f"{result['concurrency']:>4} {result['reruns']:>7} {result['throughput']:>8.1f} "
+            f"{result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f} {result['p99_ms']:>8.0f} "
+            f"{memory_text:>9} {result['backend_requests']:>7} "
+            f"{len(result['errors']):>6}"
+        )
+
+    saturation = find_saturation_point(results, p95_budget_ms)
+    print()
+    if saturation is None:
+        print("飽和点: 計測範囲内では飽和しませんでした")
+    else:
+        print(f"飽和点: 同時 {saturation} セッション（p95予算 {p95_budget_ms:.0f}ms）")
+
+    first_errors = [error for result in results for error in result["errors"]][:5]
+    for error in first_errors:
+        print(f"⚠️ {error}")
+
+
+def main() -> None:
+    """CLIエントリーポイント"""
+    parser = argparse.ArgumentParser(description="AppTestによる同時接続負荷試験")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="同時セッション数（カンマ区切り）")
+    parser.add_argument("--iterations", type=int, default=2, help="各セッションのタスク操作回数")
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="バックエンドの平均遅延")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="バックエンド遅延のばらつき")
+    parser.add_argument("--p95-budget-ms", type=float, default=1000.0, help="p95の許容値")
+    parser.add_argument("--skip-memory", action="store_true", help="メモリ計測のパスを省略")
+    args = parser.parse_args()
+
+    fake = FakeSupabase(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    install_fake_supabase(fake)
+    share_test_runtime()
+    # ワーカースレッドからAppTest.session_stateを設定するたびに出る警告を抑止
+    logging.getLogger("streamlit.runtime.scriptrunner.script_run_context").setLevel(logging.ERROR)
+
+    levels = [int(level) for level in args.levels.split(",")]
+
+    # 初回import・スクリプトのコンパイルを計測から除外するためのウォームアップ
+    run_session(-1, 1, fake)
+
+    results = []
+    for concurrency in levels:
+        print(f"同時 {concurrency} セッションで実行中...", flush=True)
+        results.append(run_level(concurrency, args.iterations, fake, not args.skip_memory))
+
+    print_report(results, args.p95_budget_ms)
+
+
+if __name__ == "__main__":
+    main()
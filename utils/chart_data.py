@@ -0,0 +1,301 @@
+"""
+グラフ用データモジュール
+
+睡眠時間・スクリーンタイム・タスク完了率の推移グラフ用に、期間内の記録を
+日別の系列にまとめ、期間の長さに応じて間引く。
+
+- 短い期間（CHART_DAILY_MAX_DAYS日以内）: 日別のまま
+- 中程度の期間（CHART_WEEKLY_MAX_DAYS日以内）: 週平均
+- それより長い期間: 月平均
+
+間引いた後もCHART_MAX_POINTS点を超える場合は、LTTB（Largest-Triangle-Three-Buckets）で
+形状を保ったまま点数を減らす。日別のまま表示する期間のうちCHART_MAX_POINTS日を超えるもの
+（記録開始から半年以内の「全期間」など）と、10年を超える月平均が対象になり、
+数年分の記録でもグラフ1枚あたりの送信量は一定に収まる。
+
+グラフのキャッシュ用に、系列の元になった記録の版（件数と最終更新時刻）も取得できる。
+
+主要機能:
+- lttb: LTTBによる間引き
+- bucket_points: 週・月単位の平均への集約
+- resolution_for_range: 期間に応じた集約単位
+- get_first_record_date: 最初の記録日
+- get_chart_data_version: 系列の元データの版
+- get_chart_series: 間引き済みの系列
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from utils.constants import (
+    CHART_DAILY_MAX_DAYS,
+    CHART_MAX_POINTS,
+    CHART_METRICS,
+    CHART_PAGE_SIZE,
+    CHART_WEEKLY_MAX_DAYS,
+)
+from utils.profiler import profiled
+from utils.supabase_client import supabase
+
+logger = logging.getLogger(__name__)
+
+Point = Tuple[date, float]
+
+# 指標ごとの元テーブルと日付列
+_METRIC_SOURCES = {
+    "sleep_hours": ("habit_records", "record_date"),
+    "screen_time_minutes": ("habit_records", "record_date"),
+    "completion_rate": ("daily_tasks", "task_date"),
+}
+
+
+class ChartSeries(NamedTuple):
+    """間引き済みの系列"""
+
+    dates: List[date]
+    values: List[float]
+    resolution: str  # 'day', 'week', 'month'
+    raw_count: int  # 間引き前の日数
+
+
+def lttb(points: List[Point], threshold: int) -> List[Point]:
+    """
+    LTTB（Largest-Triangle-Three-Buckets）で系列を間引く
+
+    先頭と末尾の点を残し、残りを threshold-2 個の区間に分けて、各区間から
+    「直前に選んだ点」と「次の区間の平均点」との三角形の面積が最大の点を選ぶ。
+    山・谷などの形状を保ったまま点数を減らせる。
+
+    Args:
+        points: 日付順の（日付, 値）のリスト
+        threshold: 間引き後の点数
+
+    Returns:
+        間引き後の（日付, 値）のリスト
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    xs = [point[0].toordinal() for point in points]
+    ys = [point[1] for point in points]
+    bucket_size = (n - 2) / (threshold - 2)
+
+    sampled = [points[0]]
+    selected = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+
+        span = next_end - end
+        avg_x = sum(xs[end:next_end]) / span
+        avg_y = sum(ys[end:next_end]) / span
+
+        ax, ay = xs[selected], ys[selected]
+        best_area = -1.0
+        best_index = start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best_index = j
+
+        sampled.append(points[best_index])
+        selected = best_index
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def bucket_points(points: List[Point], resolution: str) -> List[Point]:
+    """
+    日別の系列を週・月単位の平均にまとめる
+
+    Args:
+        points: 日付順の（日付, 値）のリスト
+        resolution: 'day', 'week'（月曜始まり）, 'month'
+
+    Returns:
+        区間の開始日と平均値のリスト
+    """
+    if resolution == "day":
+        return list(points)
+
+    buckets: Dict[date, List[float]] = defaultdict(list)
+    for day, value in points:
+        if resolution == "week":
+            key = day - timedelta(days=day.weekday())
+        else:
+            key = day.replace(day=1)
+        buckets[key].append(value)
+
+    return [(key, sum(values) / len(values)) for key, values in sorted(buckets.items())]
+
+
+def resolution_for_range(start: date, end: date) -> str:
+    """
+    期間の長さに応じた集約単位
+
+    Returns:
+        'day', 'week', 'month' のいずれか
+    """
+    days = (end - start).days + 1
+    if days <= CHART_DAILY_MAX_DAYS:
+        return "day"
+    if days <= CHART_WEEKLY_MAX_DAYS:
+        return "week"
+    return "month"
+
+
+def _iter_rows(
+    table: str, columns: str, date_column: str, user_id: str, start: date, end: date
+) -> Iterator[Dict]:
+    """期間内の行をidのキーセットでページングしながら列挙"""
+    last_id = None
+    while True:
+        query = supabase.table(table)\
+            .select(columns)\
+            .eq("user_id", user_id)\
+            .gte(date_column, start.isoformat())\
+            .lte(date_column, end.isoformat())\
+            .order("id")\
+            .limit(CHART_PAGE_SIZE)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+
+        rows = query.execute().data
+        yield from rows
+
+        if len(rows) < CHART_PAGE_SIZE:
+            return
+        last_id = rows[-1]["id"]
+
+
+def _daily_points(user_id: str, metric: str, start: date, end: date) -> List[Point]:
+    """指標の日別の値（記録のない日は含まない）"""
+    table, date_column = _METRIC_SOURCES[metric]
+
+    if metric == "completion_rate":
+        totals: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        for row in _iter_rows(
+            table, "id, task_date, is_completed", date_column, user_id, start, end
+        ):
+            counts = totals[row["task_date"]]
+            counts[0] += 1
+            counts[1] += 1 if row["is_completed"] else 0
+        points = [
+            (date.fromisoformat(day), 100.0 * completed / total)
+            for day, (total, completed) in totals.items()
+        ]
+    else:
+        points = [
+            (date.fromisoformat(row[date_column]), float(row[metric]))
+            for row in _iter_rows(
+                table, f"id, {date_column}, {metric}", date_column, user_id, start, end
+            )
+            if row[metric] is not None
+        ]
+
+    points.sort()
+    return points
+
+
+@profiled("db")
+def get_first_record_date(user_id: str, metric: str) -> Optional[date]:
+    """
+    指標の元テーブルで最初に記録された日付を取得（「全期間」表示用）
+
+    Args:
+        user_id: ユーザーID
+        metric: CHART_METRICSのキー
+
+    Returns:
+        最初の記録日。記録がない・失敗時はNone。
+    """
+    table, date_column = _METRIC_SOURCES[metric]
+    try:
+        response = supabase.table(table)\
+            .select(date_column)\
+            .eq("user_id", user_id)\
+            .order(date_column)\
+            .limit(1)\
+            .execute()
+
+        return date.fromisoformat(response.data[0][date_column]) if response.data else None
+
+    except Exception as e:
+        logger.error("Error fetching first record date: %s", e)
+        return None
+
+
+@profiled("db")
+def get_chart_data_version(user_id: str, metric: str, start: date, end: date) -> Optional[str]:
+    """
+    系列の元データの版を取得
+
+    期間内の行数と最終更新時刻の組み合わせで、追加・更新・削除のいずれでも変わる。
+    1回の軽量なクエリで取得できるため、グラフのキャッシュキーに使う。
+
+    Args:
+        user_id: ユーザーID
+        metric: CHART_METRICSのキー
+        start: 開始日
+        end: 終了日（この日を含む）
+
+    Returns:
+        版を表す文字列。失敗時はNone。
+    """
+    table, date_column = _METRIC_SOURCES[metric]
+    try:
+        response = supabase.table(table)\
+            .select("updated_at", count="exact")\
+            .eq("user_id", user_id)\
+            .gte(date_column, start.isoformat())\
+            .lte(date_column, end.isoformat())\
+            .order("updated_at", desc=True)\
+            .limit(1)\
+            .execute()
+
+        latest = response.data[0]["updated_at"] if response.data else ""
+        return f"{response.count}:{latest}"
+
+    except Exception as e:
+        logger.error("Error fetching chart data version: %s", e)
+        return None
+
+
+@profiled("db")
+def get_chart_series(user_id: str, metric: str, start: date, end: date) -> Optional[ChartSeries]:
+    """
+    期間に応じて間引いた系列を取得
+
+    Args:
+        user_id: ユーザーID
+        metric: CHART_METRICSのキー
+        start: 開始日
+        end: 終了日（この日を含む）
+
+    Returns:
+        間引き済みの系列。失敗時はNone。
+    """
+    if metric not in CHART_METRICS:
+        raise ValueError(f"Unknown chart metric: {metric}")
+
+    try:
+        daily = _daily_points(user_id, metric, start, end)
+    except Exception as e:
+        logger.error("Error fetching chart data: %s", e)
+        return None
+
+    resolution = resolution_for_range(start, end)
+    points = lttb(bucket_points(daily, resolution), CHART_MAX_POINTS)
+
+    return ChartSeries(
+        dates=[day for day, _ in points],
+        values=[round(value, 2) for _, value in points],
+        resolution=resolution,
+        raw_count=len(daily),
+    )
@@ -3,6 +3,7 @@
 
 主要機能:
 - タスク関連定数（カテゴリ、優先度、色）
+- ルーティン関連定数
 - 習慣関連定数
 - ポモドーロ関連定数
 - UI関連定数（カラーパレット）
@@ -33,18 +34,117 @@ PRIORITY_COLORS = {
 }
 
 MAX_TASKS_PER_DAY = 20
+TASK_TABLE_AUTO_THRESHOLD = 10  # これを超える件数では一覧（表形式）表示を既定にする
+
+TASK_VIEW_MODES = ["カード", "一覧"]
+
+# ルーティン関連
+ROUTINE_LOOKAHEAD_DAYS = 7  # 事前生成する日数
+ROUTINE_UPSERT_CHUNK_SIZE = 500  # 1リクエストあたりの最大行数
+ROUTINE_USER_CHUNK_SIZE = 100  # 削除済み・既存タスクを1回に問い合わせるユーザー数
+ROUTINE_STATE_PAGE_SIZE = 1000  # 削除済み・既存タスク取得時の1ページの行数
 
 # 習慣関連
 MIN_SLEEP_HOURS = 4
 MAX_SLEEP_HOURS = 12
 DEFAULT_SLEEP_HOURS = 8
 MAX_SCREEN_TIME_MINUTES = 180  # 3時間
+HABIT_FLUSH_DEBOUNCE_SECONDS = 5  # 最後の入力変更から自動保存するまでの秒数
+
+# habit_recordsで画面から更新可能なフィールド
+HABIT_FIELDS = (
+    "sleep_hours",
+    "exercise_done",
+    "meditation_done",
+    "reading_minutes",
+    "water_intake_liters",
+    "sunlight_done",
+    "cold_shower_done",
+    "no_porn_achieved",
+    "no_short_videos_achieved",
+    "no_junk_food_achieved",
+    "no_alcohol_tobacco_achieved",
+    "screen_time_minutes",
+    "mood_rating",
+    "notes",
+)
+
+# 週次レポートの達成率に使う習慣チェック項目
+HABIT_CHECK_FIELDS = (
+    "exercise_done",
+    "meditation_done",
+    "sunlight_done",
+    "cold_shower_done",
+    "no_porn_achieved",
+    "no_short_videos_achieved",
+    "no_junk_food_achieved",
+    "no_alcohol_tobacco_achieved",
+)
+
+# 習慣チェック項目の表示名
+HABIT_CHECK_LABELS = {
+    "exercise_done": "🏃 運動",
+    "meditation_done": "🧘 瞑想",
+    "sunlight_done": "☀️ 日光を浴びる",
+    "cold_shower_done": "🚿 冷水シャワー",
+    "no_porn_achieved": "🚫 ポルノなし",
+    "no_short_videos_achieved": "🚫 ショート動画なし",
+    "no_junk_food_achieved": "🚫 ジャンクフードなし",
+    "no_alcohol_tobacco_achieved": "🚫 酒・たばこなし",
+}
 
 # ポモドーロ
 POMODORO_WORK_MINUTES = 25
 POMODORO_SHORT_BREAK_MINUTES = 5
 POMODORO_LONG_BREAK_MINUTES = 15
 
+# 日付・時刻関連
+APP_TIMEZONE = "Asia/Tokyo"  # 「今日」の区切りやリマインダー時刻の基準（サーバーのタイムゾーンに依存しない）
+
+# バックグラウンド処理関連
+LOCAL_STATE_DIR = ".monk_state"  # ジョブ状態などローカル保存先（MONK_MODE_STATE_DIRで変更可）
+SCHEDULER_POLL_SECONDS = 60  # ジョブの実行時刻を確認する間隔
+REPORT_PAGE_SIZE = 1000  # 週次レポート集計時の1ページの行数
+
+# リマインダー関連
+TASK_REMINDER_TIME = "08:00"  # タスク確認リマインダーの時刻
+ROUTINE_REMINDER_TIME = "07:00"  # ルーティン開始リマインダーの時刻
+WATER_REMINDER_START_HOUR = 8  # 水分補給リマインダーの開始時刻
+WATER_REMINDER_END_HOUR = 22  # 水分補給リマインダーの終了時刻
+REMINDER_POLL_SECONDS = 60  # 配信スレッドの最大待機時間
+REMINDER_PAGE_SIZE = 1000  # 通知設定読み込み時の1ページの行数
+
+# 耐障害性関連
+DB_READ_TIMEOUT_SECONDS = 3.0  # DB読み込み1回あたりの待ち時間の上限
+DB_READ_MAX_WORKERS = 8  # DB読み込みを実行するスレッド数
+CIRCUIT_FAILURE_THRESHOLD = 5  # サーキットブレーカーを開く連続失敗回数
+CIRCUIT_RESET_SECONDS = 30  # サーキットブレーカーを開いてから再試行するまでの秒数
+STALE_CACHE_MAX_ENTRIES = 1000  # 前回取得結果を保持する最大件数
+OFFLINE_KNOWN_TASKS_MAX = 5000  # オフライン変更の衝突検出用に保持するタスク数
+
+# グラフ関連
+CHART_METRICS = {
+    "sleep_hours": "睡眠時間（時間）",
+    "screen_time_minutes": "スクリーンタイム（分）",
+    "completion_rate": "タスク完了率（%）",
+}
+CHART_RANGES = {"1ヶ月": 30, "3ヶ月": 90, "1年": 365, "全期間": None}  # 表示期間（日数）
+CHART_DAILY_MAX_DAYS = 180  # 日別のまま表示する最長期間
+CHART_WEEKLY_MAX_DAYS = 730  # 週平均で表示する最長期間（超えると月平均）
+CHART_MAX_POINTS = 120  # グラフ1本あたりの最大点数（日別で表示する121〜180日の期間をLTTBで間引く）
+CHART_PAGE_SIZE = 1000  # グラフ用データ取得時の1ページの行数
+CHART_CACHE_MAX_ENTRIES = 64  # キャッシュするグラフ数
+
+# 検索関連
+MAX_SEARCH_RESULTS = 100  # 1回の検索で返す最大件数
+
+# データ移行関連
+EXPORT_PAGE_SIZE = 1000  # エクスポート時の1ページの行数
+IMPORT_CHUNK_SIZE = 500  # インポート時の1リクエストあたりの行数
+
+# デバッグ関連
+PROFILE_HISTORY_SIZE = 20  # プロファイルパネルに表示するrerun数
+
 # 認証関連
 MIN_PASSWORD_LENGTH = 8
 MAX_DISPLAY_NAME_LENGTH = 100
@@ -0,0 +1,346 @@
+"""
+ユーザーデータのエクスポート・インポート
+
+ユーザーの全記録をJSON Lines形式でバックアップ・移行する。
+エクスポートはidのキーセットでページングしながら1行ずつ書き出し、
+インポートは一定件数ごとにまとめてupsertするため、
+履歴の長さに関係なくメモリ使用量は1ページ分に収まる。
+
+インポート先に同じ日付の記録など自然キーが一致する行が既にある場合は、
+その行のidへ置き換えて上書きする（途中で一意制約違反にならない）。
+移行先ユーザーを指定した場合は、元のidから決定的に求めた新しいidで複製し、
+タスク・ルーティンへの参照も同じ計算で新しいidに付け替える。
+対応表として保持するのは、自然キーの一致で既存行のidに置き換えた行だけ。
+
+ファイル形式（1行1レコード、拡張子.gzの場合はgzip圧縮）:
+    {"table": "daily_tasks", "row": {...}}
+
+主要機能:
+- export_user_data: ユーザーデータのエクスポート
+- import_user_data: ユーザーデータのインポート
+
+使用例:
+    python -m utils.data_transfer export --user-id <UUID> --output backup.jsonl.gz
+    python -m utils.data_transfer import --input backup.jsonl.gz --target-user-id <UUID>
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import time
+import uuid
+from typing import Dict, IO, Iterator, List, Optional, Tuple
+
+from supabase import Client
+
+from utils.constants import EXPORT_PAGE_SIZE, IMPORT_CHUNK_SIZE
+from utils.exceptions import DatabaseError, ValidationError
+from utils.supabase_client import supabase, get_admin_client
+
+logger = logging.getLogger(__name__)
+
+# 外部キーの参照先が先に来る順序（インポート時もこの順で登録される）
+EXPORT_TABLES = (
+    "routines",
+    "daily_tasks",
+    "habit_records",
+    "journals",
+    "pomodoro_sessions",
+    "weekly_reviews",
+)
+
+# DB側で自動生成されるため書き込めない列
+GENERATED_COLUMNS = frozenset({"search_text"})
+
+# id以外の一意制約（自然キー）。daily_tasksはルーティン由来の行のみ対象
+NATURAL_KEYS = {
+    "daily_tasks": ("routine_id", "task_date"),
+    "habit_records": ("user_id", "record_date"),
+    "journals": ("user_id", "journal_date"),
+    "weekly_reviews": ("user_id", "week_start_date"),
+}
+
+# 他テーブルのidを参照する列（列名 -> 参照先テーブル）
+REFERENCE_COLUMNS = {
+    "daily_tasks": {"routine_id": "routines"},
+    "pomodoro_sessions": {"task_id": "daily_tasks"},
+}
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    """拡張子に応じて通常ファイルまたはgzipファイルを開く"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _iter_table_rows(client: Client, table: str, user_id: str) -> Iterator[Dict]:
+    """
+    テーブルの行をidのキーセットでページングしながら列挙
+
+    OFFSET方式と異なり、後半のページでも取得コストが一定になる。
+    """
+    last_id = None
+    while True:
+        query = client.table(table)\
+            .select("*")\
+            .eq("user_id", user_id)\
+            .order("id")\
+            .limit(EXPORT_PAGE_SIZE)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+
+        rows = query.execute().data
+        if not rows:
+            return
+
+        for row in rows:
+            yield row
+
+        if len(rows) < EXPORT_PAGE_SIZE:
+            return
+        last_id = rows[-1]["id"]
+
+
+def _build_stats(counts: Dict[str, int], started: float) -> Dict:
+    """転送件数と経過時間からスループットを計算"""
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    return {
+        "rows": total,
+        "seconds": elapsed,
+        "rows_per_second": total / elapsed if elapsed > 0 else 0.0,
+        "by_table": counts,
+    }
+
+
+def export_user_data(
+    user_id: str, path: str, client: Optional[Client] = None
+) -> Dict:
+    """
+    ユーザーの全データをJSON Linesファイルへエクスポート
+
+    Args:
+        user_id: エクスポート対象のユーザーID
+        path: 出力ファイルパス（.gzで終わる場合はgzip圧縮）
+        client: 使用するクライアント。省略時はログイン中ユーザーのクライアント。
+
+    Returns:
+        転送結果（rows, seconds, rows_per_second, by_table）
+
+    Raises:
+        DatabaseError: データ取得に失敗した場合
+    """
+    client = client or supabase
+    counts = {table: 0 for table in EXPORT_TABLES}
+    started = time.perf_counter()
+
+    try:
+        with _open(path, "w") as fp:
+            for table in EXPORT_TABLES:
+                for row in _iter_table_rows(client, table, user_id):
+                    for column in GENERATED_COLUMNS:
+                        row.pop(column, None)
+                    fp.write(json.dumps({"table": table, "row": row}, ensure_ascii=False))
+                    fp.write("\n")
+                    counts[table] += 1
+
+    except Exception as e:
+        logger.error("Error exporting user data: %s", e)
+        raise DatabaseError(f"データのエクスポートに失敗: {e}")
+
+    stats = _build_stats(counts, started)
+    logger.info(
+        "Exported %d rows for user %s (%.0f rows/s)",
+        stats["rows"], user_id, stats["rows_per_second"],
+    )
+    return stats
+
+
+def _retargeted_id(target_user_id: str, source_id: str) -> str:
+    """移行先ユーザー用の新しいid（同じファイルを再実行しても同じidになる）"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"monk-mode:{target_user_id}:{source_id}"))
+
+
+def _resolve_natural_keys(
+    client: Client, table: str, entries: List[Tuple[str, Dict]], id_map: Dict[str, str]
+) -> None:
+    """
+    自然キーが一致する既存行があれば、行のidをその行のidに置き換える
+
+    置き換えたidはid_mapにも反映し、後続テーブルの参照を付け替えられるようにする。
+
+    Args:
+        entries: （元のid, インポートする行）のリスト
+        id_map: 元のid -> 置き換え先の既存行のid
+    """
+    if table not in NATURAL_KEYS:
+        return
+
+    group_column, key_column = NATURAL_KEYS[table]
+    groups: Dict[str, List[Tuple[str, Dict]]] = {}
+    for source_id, row in entries:
+        if row.get(group_column) is not None:
+            groups.setdefault(row[group_column], []).append((source_id, row))
+
+    for group_value, group_entries in groups.items():
+        existing = client.table(table)\
+            .select(f"id, {key_column}")\
+            .eq(group_column, group_value)\
+            .in_(key_column, [row[key_column] for _, row in group_entries])\
+            .execute().data
+        existing_ids = {item[key_column]: item["id"] for item in existing}
+
+        for source_id, row in group_entries:
+            existing_id = existing_ids.get(row[key_column])
+            if existing_id is not None and existing_id != row["id"]:
+                id_map[source_id] = existing_id
+                row["id"] = existing_id
+
+
+def _upsert_chunk(
+    client: Client, table: str, entries: List[Tuple[str, Dict]], id_map: Dict[str, str]
+) -> None:
+    """同一テーブルの行を、自然キーの重複を解消したうえでidで一括upsert"""
+    _resolve_natural_keys(client, table, entries, id_map)
+    client.table(table).upsert([row for _, row in entries], on_conflict="id").execute()
+
+
+def _prepare_row(
+    table: str, row: Dict, target_user_id: Optional[str], id_map: Dict[str, str]
+) -> Dict:
+    """
+    インポートする行のuser_id・id・参照列を移行先に合わせて書き換える
+
+    参照列は、参照先が自然キーの一致で既存行に置き換わっていればそのid、
+    移行時は参照先と同じ計算で求めた新しいidにする。
+    """
+    for column in GENERATED_COLUMNS:
+        row.pop(column, None)
+
+    for column in REFERENCE_COLUMNS.get(table, {}):
+        source_ref = row.get(column)
+        if source_ref is None:
+            continue
+        if source_ref in id_map:
+            row[column] = id_map[source_ref]
+        elif target_user_id:
+            row[column] = _retargeted_id(target_user_id, source_ref)
+
+    if target_user_id:
+        row["user_id"] = target_user_id
+        row["id"] = _retargeted_id(target_user_id, row["id"])
+
+    return row
+
+
+def import_user_data(
+    path: str,
+    target_user_id: Optional[str] = None,
+    client: Optional[Client] = None,
+) -> Dict:
+    """
+    JSON Linesファイルからユーザーデータをインポート
+
+    ファイルを1行ずつ読み、IMPORT_CHUNK_SIZE件ごとにidでupsertする。
+    同じ日付の記録など自然キーが一致する既存行は上書きするため、記録のある
+    アカウントへの復元でも途中で失敗しない。同じファイルを複数回インポートしても
+    重複は発生しない。
+
+    Args:
+        path: 入力ファイルパス（.gzで終わる場合はgzip圧縮）
+        target_user_id: 指定時はこのユーザーの行として新しいidで複製する
+            （アカウント移行用。元ユーザーの行は変更しない）
+        client: 使用するクライアント。省略時はログイン中ユーザーのクライアント。
+
+    Returns:
+        転送結果（rows, seconds, rows_per_second, by_table）
+
+    Raises:
+        ValidationError: ファイル形式が不正な場合
+        DatabaseError: 登録に失敗した場合
+    """
+    client = client or supabase
+    counts = {table: 0 for table in EXPORT_TABLES}
+    started = time.perf_counter()
+    current_table = None
+    buffer: List[Tuple[str, Dict]] = []
+    # 元のid -> 既存行のid（自然キーの一致で置き換えた行のみ）
+    id_map: Dict[str, str] = {}
+
+    try:
+        with _open(path, "r") as fp:
+            for line_no, line in enumerate(fp, start=1):
+                if not line.strip():
+                    continue
+
+                try:
+                    record = json.loads(line)
+                    table, row = record["table"], record["row"]
+                except (ValueError, KeyError, TypeError):
+                    raise ValidationError(f"{line_no}行目の形式が不正です")
+                if table not in counts:
+                    raise ValidationError(f"{line_no}行目: 未対応のテーブルです: {table}")
+
+                if table != current_table or len(buffer) >= IMPORT_CHUNK_SIZE:
+                    if buffer:
+                        _upsert_chunk(client, current_table, buffer, id_map)
+                        counts[current_table] += len(buffer)
+                    current_table, buffer = table, []
+
+                source_id = row.get("id")
+                buffer.append((source_id, _prepare_row(table, row, target_user_id, id_map)))
+
+            if buffer:
+                _upsert_chunk(client, current_table, buffer, id_map)
+                counts[current_table] += len(buffer)
+
+    except ValidationError:
+        raise
+    except Exception as e:
+        logger.error("Error importing user data: %s", e)
+        raise DatabaseError(f"データのインポートに失敗: {e}")
+
+    stats = _build_stats(counts, started)
+    logger.info(
+        "Imported %d rows from %s (%.0f rows/s)",
+        stats["rows"], path, stats["rows_per_second"],
+    )
+    return stats
+
+
+def main() -> None:
+    """CLIエントリーポイント（service_roleキーを使用）"""
+    parser = argparse.ArgumentParser(description="ユーザーデータのエクスポート・インポート")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="エクスポート")
+    export_parser.add_argument("--user-id", required=True, help="対象ユーザーID")
+    export_parser.add_argument("--output", required=True, help="出力ファイル（.jsonl / .jsonl.gz）")
+
+    import_parser = subparsers.add_parser("import", help="インポート")
+    import_parser.add_argument("--input", required=True, help="入力ファイル（.jsonl / .jsonl.gz）")
+    import_parser.add_argument(
+        "--target-user-id", help="移行先ユーザーID（新しいidで複製。省略時はファイルのuser_id・idのまま）"
+    )
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    client = get_admin_client()
+
+    if args.command == "export":
+        stats = export_user_data(args.user_id, args.output, client=client)
+    else:
+        stats = import_user_data(args.input, args.target_user_id, client=client)
+
+    print(
+        f"✅ {stats['rows']}行を{stats['seconds']:.1f}秒で処理しました"
+        f"（{stats['rows_per_second']:.0f}行/秒）"
+    )
+    for table, count in stats["by_table"].items():
+        print(f"  - {table}: {count}行")
+
+
+if __name__ == "__main__":
+    main()
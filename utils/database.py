@@ -1,70 +1,268 @@
 """
 データベース操作モジュール
 
-daily_tasksテーブルに対するCRUD操作を提供する。
+daily_tasks・pomodoro_sessions・habit_records・journals・notification_settingsテーブルに対する操作を提供する。
 すべてのDB操作はこのモジュールに集約する。
 
+画面表示に使う読み込み（*_with_status）は待ち時間の上限付きで実行し、
+応答が遅い・失敗した場合は前回取得した結果を返す（utils/resilience.py）。
+サーバーに接続できない間のタスクの作成・更新・完了切り替え・削除は
+オフライン変更ログに記録し、接続回復後にまとめて送信する（utils/offline_queue.py）。
+
 主要機能:
 - get_tasks_by_date: 指定日のタスク一覧取得
+- get_tasks_by_date_with_status: 指定日のタスク一覧取得（古いデータかどうかの情報付き）
 - create_task: タスク作成
 - update_task: タスク更新
 - delete_task: タスク削除
 - toggle_task_completion: タスク完了状態の切り替え
+- flush_offline_task_changes: オフライン中のタスク変更の一括送信
+- count_offline_task_changes: 未送信のタスク変更の件数
+- pop_offline_conflicts: 衝突により破棄したオフライン変更の取得
+- bulk_update_tasks: 複数タスクの一括更新
+- delete_tasks: 複数タスクの一括削除
 - get_task_completion_rate: タスク完了率の計算
+- create_pomodoro_session: ポモドーロセッション開始記録
+- complete_pomodoro_session: ポモドーロセッション完了記録
+- get_focus_minutes_by_tasks(_with_status): タスク別集中時間の一括取得
+- get_daily_focus_minutes(_with_status): 日別集中時間の取得
+- get_habit_records: 期間内の習慣記録の一括取得
+- upsert_habit_records: 習慣記録の一括upsert
+- search: タスク・日記の全文検索
+- get_notification_settings: 通知設定の取得
+- update_notification_settings: 通知設定の更新（リマインダー予定へ即時反映）
 """
 
 import logging
+import unicodedata
+import uuid
 from datetime import datetime
+from operator import attrgetter
 from typing import List, Dict, Optional
 
+from utils.constants import MAX_SEARCH_RESULTS
+from utils.models import Priority, Task, TASK_COLUMNS
+from utils.offline_queue import (
+    OP_CREATE,
+    OP_DELETE,
+    OP_UPDATE,
+    apply_pending,
+    flush_pending,
+    get_offline_queue,
+    is_backend_unreachable,
+    known_task,
+    local_task,
+    pop_conflicts,
+    remember_tasks,
+)
+from utils.profiler import profiled
+from utils.reminders import get_reminder_engine
+from utils.resilience import (
+    CircuitBreaker,
+    ReadResult,
+    backend_breaker,
+    resilient_read,
+    run_with_budget,
+)
 from utils.supabase_client import supabase
 
 logger = logging.getLogger(__name__)
 
 
-def get_tasks_by_date(user_id: str, task_date: str) -> List[Dict]:
+def _fetch_tasks_by_date(user_id: str, task_date: str) -> List[Task]:
+    """指定日のタスク一覧をDBから取得（失敗時は例外を送出）"""
+    response = supabase.table("daily_tasks")\
+        .select(TASK_COLUMNS)\
+        .eq("user_id", user_id)\
+        .eq("task_date", task_date)\
+        .order("is_completed")\
+        .order("created_at")\
+        .execute()
+
+    # アプリ側で優先度ソート（Supabaseはカスタムソート順未対応のため）
+    tasks = Task.from_rows(response.data)
+    tasks.sort(key=attrgetter("sort_key"))
+    remember_tasks(tasks)
+
+    return tasks
+
+
+def _is_offline() -> bool:
+    """サーキットブレーカーが開いており、サーバーへ送らない状態か"""
+    return backend_breaker.state == CircuitBreaker.OPEN
+
+
+def _queue_offline(
+    user_id: str, op: str, task_id: str, payload: Optional[Dict] = None
+) -> bool:
     """
-    指定日のタスク一覧を取得
+    タスクの変更をオフライン変更ログに記録
 
-    未完了タスクを先に、優先度の高い順に返す。
+    更新・削除では、サーバーで確認済みのupdated_atを衝突検出の基準として残す。
+
+    Returns:
+        記録できた場合True
+    """
+    try:
+        known = known_task(task_id)
+        get_offline_queue().append(
+            user_id, op, task_id, payload, known.updated_at if known else None
+        )
+        logger.warning("Backend unreachable; queued task %s offline: %s", op, task_id)
+        return True
+
+    except Exception as e:
+        logger.error("Error queueing offline task change %s: %s", task_id, e)
+        return False
+
+
+def flush_offline_task_changes(user_id: str) -> bool:
+    """
+    オフライン中に記録したタスクの変更をまとめて送信
 
     Args:
         user_id: ユーザーID
-        task_date: 対象日付（YYYY-MM-DD形式）
 
     Returns:
-        タスクのリスト
+        未送信の変更がなくなった場合True
     """
     try:
-        response = supabase.table("daily_tasks")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .eq("task_date", task_date)\
-            .order("is_completed")\
-            .order("created_at")\
-            .execute()
+        flush_pending(supabase, user_id)
+        backend_breaker.record_success()
+        return True
+
+    except Exception as e:
+        if is_backend_unreachable(e):
+            backend_breaker.record_failure()
+        logger.error("Error flushing offline task changes: %s", e)
+        return False
+
+
+def count_offline_task_changes(user_id: str) -> int:
+    """
+    未送信のタスクの変更の件数
+
+    Args:
+        user_id: ユーザーID
+
+    Returns:
+        件数。取得できない場合は0。
+    """
+    try:
+        return get_offline_queue().pending_count(user_id)
+
+    except Exception as e:
+        logger.error("Error counting offline task changes: %s", e)
+        return 0
+
+
+def pop_offline_conflicts(user_id: str) -> List[Dict]:
+    """
+    送信時に他の端末の変更と衝突し、破棄したオフライン変更を取得
+
+    Args:
+        user_id: ユーザーID
+
+    Returns:
+        task_id, op, title, reasonの辞書のリスト（取得すると消去される）
+    """
+    return pop_conflicts(user_id)
+
+
+@profiled("db")
+def get_tasks_by_date_with_status(
+    user_id: str, task_date: str, timeout: Optional[float] = None
+) -> ReadResult:
+    """
+    指定日のタスク一覧を、古いデータかどうかの情報付きで取得
+
+    timeout秒以内に取得できない・失敗した場合は、前回取得した一覧を
+    is_stale=Trueで返す（取得はバックグラウンドで継続する）。
+    オフライン中に記録した変更があれば、接続できる場合は先に送信し
+    （待ち時間の上限はtimeoutと同じ。超えた送信はバックグラウンドで継続する）、
+    送信できていない変更は一覧に重ねて返す。
+
+    Args:
+        user_id: ユーザーID
+        task_date: 対象日付（YYYY-MM-DD形式）
+        timeout: 待ち時間の上限（秒）。省略時は既定値。
 
-        # アプリ側で優先度ソート（Supabaseはカスタムソート順未対応のため）
-        priority_order = {"high": 0, "medium": 1, "low": 2}
-        tasks = response.data
-        tasks.sort(key=lambda t: (
-            t["is_completed"],
-            priority_order.get(t["priority"], 1),
-            t["created_at"],
-        ))
+    Returns:
+        valueがタスクのリストの読み込み結果
+    """
+    if count_offline_task_changes(user_id) and not _is_offline():
+        run_with_budget(
+            ("offline_flush", user_id), flush_offline_task_changes, (user_id,), timeout=timeout,
+        )
 
-        return tasks
+    result = resilient_read(
+        ("tasks", user_id, task_date), _fetch_tasks_by_date, (user_id, task_date),
+        default=[], timeout=timeout,
+    )
 
+    try:
+        ops = get_offline_queue().pending(user_id)
     except Exception as e:
-        logger.error("Error fetching tasks: %s", e)
-        return []
+        logger.error("Error reading offline task changes: %s", e)
+        return result
+
+    if not ops:
+        return result
+    return result._replace(value=apply_pending(result.value, ops, task_date))
+
+
+def get_tasks_by_date(user_id: str, task_date: str) -> List[Task]:
+    """
+    指定日のタスク一覧を取得
+
+    未完了タスクを先に、優先度の高い順に返す。
+    取得できない場合は前回取得した一覧（なければ空リスト）を返す。
+
+    Args:
+        user_id: ユーザーID
+        task_date: 対象日付（YYYY-MM-DD形式）
+
+    Returns:
+        タスクのリスト
+    """
+    return get_tasks_by_date_with_status(user_id, task_date).value
+
+
+def _offline_task_row(user_id: str, task_data: Dict) -> Dict:
+    """オフライン作成するタスクの全列（IDはクライアントで採番）"""
+    now = datetime.now().astimezone().isoformat()
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "title": task_data["title"],
+        "description": task_data.get("description"),
+        "category": task_data.get("category"),
+        "priority": task_data.get("priority", Priority.MEDIUM.value),
+        "is_completed": False,
+        "task_date": task_data["task_date"],
+        "completed_at": None,
+        "display_order": 0,
+        "routine_id": task_data.get("routine_id"),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def _create_task_offline(user_id: str, task_data: Dict) -> Optional[Task]:
+    row = _offline_task_row(user_id, task_data)
+    if not _queue_offline(user_id, OP_CREATE, row["id"], row):
+        return None
+    return Task.from_row(row)
 
 
-def create_task(user_id: str, task_data: Dict) -> Optional[Dict]:
+@profiled("db")
+def create_task(user_id: str, task_data: Dict) -> Optional[Task]:
     """
     新規タスクを作成
 
     display_orderは既存タスクの最大値+1が自動設定される。
+    サーバーに接続できない場合はクライアントで採番したIDで作成し、
+    オフライン変更ログに記録する（接続回復後に送信）。
 
     Args:
         user_id: ユーザーID
@@ -73,6 +271,9 @@ def create_task(user_id: str, task_data: Dict) -> Optional[Dict]:
     Returns:
         作成されたタスク。失敗時はNone。
     """
+    if _is_offline():
+        return _create_task_offline(user_id, task_data)
+
     try:
         # display_orderを計算
         max_order_response = supabase.table("daily_tasks")\
@@ -96,17 +297,33 @@ def create_task(user_id: str, task_data: Dict) -> Optional[Dict]:
             .execute()
 
         logger.info("Created task: %s", response.data[0]["id"])
-        return response.data[0] if response.data else None
+        tasks = Task.from_rows(response.data)
+        remember_tasks(tasks)
+        return tasks[0] if tasks else None
 
     except Exception as e:
+        if is_backend_unreachable(e):
+            backend_breaker.record_failure()
+            return _create_task_offline(user_id, task_data)
         logger.error("Error creating task: %s", e)
         return None
 
 
+def _update_task_offline(task_id: str, updates: Dict) -> bool:
+    task = local_task(task_id)
+    if task is None:
+        logger.error("Cannot queue update for unknown task: %s", task_id)
+        return False
+    return _queue_offline(task.user_id, OP_UPDATE, task_id, updates)
+
+
+@profiled("db")
 def update_task(task_id: str, updates: Dict) -> bool:
     """
     タスクを更新
 
+    サーバーに接続できない場合はオフライン変更ログに記録する。
+
     Args:
         task_id: タスクID
         updates: 更新内容の辞書
@@ -114,32 +331,53 @@ def update_task(task_id: str, updates: Dict) -> bool:
     Returns:
         成功時True
     """
+    if _is_offline():
+        return _update_task_offline(task_id, updates)
+
     try:
         updates["updated_at"] = datetime.now().isoformat()
 
-        supabase.table("daily_tasks")\
+        response = supabase.table("daily_tasks")\
             .update(updates)\
             .eq("id", task_id)\
             .execute()
 
+        remember_tasks(Task.from_rows(response.data))
         logger.info("Updated task: %s", task_id)
         return True
 
     except Exception as e:
+        if is_backend_unreachable(e):
+            backend_breaker.record_failure()
+            return _update_task_offline(task_id, updates)
         logger.error("Error updating task %s: %s", task_id, e)
         return False
 
 
+def _delete_task_offline(task_id: str) -> bool:
+    task = local_task(task_id)
+    if task is None:
+        logger.error("Cannot queue delete for unknown task: %s", task_id)
+        return False
+    return _queue_offline(task.user_id, OP_DELETE, task_id)
+
+
+@profiled("db")
 def delete_task(task_id: str) -> bool:
     """
     タスクを物理削除
 
+    サーバーに接続できない場合はオフライン変更ログに記録する。
+
     Args:
         task_id: タスクID
 
     Returns:
         成功時True
     """
+    if _is_offline():
+        return _delete_task_offline(task_id)
+
     try:
         supabase.table("daily_tasks")\
             .delete()\
@@ -150,16 +388,41 @@ def delete_task(task_id: str) -> bool:
         return True
 
     except Exception as e:
+        if is_backend_unreachable(e):
+            backend_breaker.record_failure()
+            return _delete_task_offline(task_id)
         logger.error("Error deleting task %s: %s", task_id, e)
         return False
 
 
+def _completion_updates(is_completed: bool) -> Dict:
+    """完了状態の変更内容（完了時刻を含む）"""
+    return {
+        "is_completed": is_completed,
+        "completed_at": datetime.now().isoformat() if is_completed else None,
+        "updated_at": datetime.now().isoformat(),
+    }
+
+
+def _toggle_task_offline(task_id: str) -> bool:
+    task = local_task(task_id)
+    if task is None:
+        logger.error("Cannot queue toggle for unknown task: %s", task_id)
+        return False
+    return _queue_offline(
+        task.user_id, OP_UPDATE, task_id, _completion_updates(not task.is_completed)
+    )
+
+
+@profiled("db")
 def toggle_task_completion(task_id: str) -> bool:
     """
     タスクの完了状態を切り替え
 
     完了時にはcompleted_atにタイムスタンプを記録し、
     未完了に戻す場合はNoneにする。
+    サーバーに接続できない場合は、把握している状態を反転した変更を
+    オフライン変更ログに記録する。
 
     Args:
         task_id: タスクID
@@ -167,6 +430,9 @@ def toggle_task_completion(task_id: str) -> bool:
     Returns:
         成功時True
     """
+    if _is_offline():
+        return _toggle_task_offline(task_id)
+
     try:
         response = supabase.table("daily_tasks")\
             .select("is_completed")\
@@ -177,25 +443,91 @@ def toggle_task_completion(task_id: str) -> bool:
         current_status = response.data["is_completed"]
         new_status = not current_status
 
-        updates = {
-            "is_completed": new_status,
-            "completed_at": datetime.now().isoformat() if new_status else None,
-            "updated_at": datetime.now().isoformat(),
-        }
-
-        supabase.table("daily_tasks")\
-            .update(updates)\
+        response = supabase.table("daily_tasks")\
+            .update(_completion_updates(new_status))\
             .eq("id", task_id)\
             .execute()
 
+        remember_tasks(Task.from_rows(response.data))
         logger.info("Toggled task %s: completed=%s", task_id, new_status)
         return True
 
     except Exception as e:
+        if is_backend_unreachable(e):
+            backend_breaker.record_failure()
+            return _toggle_task_offline(task_id)
         logger.error("Error toggling task completion %s: %s", task_id, e)
         return False
 
 
+@profiled("db")
+def bulk_update_tasks(rows: List[Dict]) -> bool:
+    """
+    複数タスクの変更列をまとめて更新
+
+    各行はidと変更した列だけを含むこと。upsertと異なり既存の行だけを
+    更新するため、他の端末で削除されたタスクを作り直さない。
+    同じ変更（例: まとめて完了）の行は1回のリクエストで更新する。
+
+    Args:
+        rows: タスクIDと変更した列の辞書のリスト
+
+    Returns:
+        成功時True
+    """
+    if not rows:
+        return True
+
+    try:
+        now = datetime.now().isoformat()
+        groups: Dict[tuple, List[str]] = {}
+        for row in rows:
+            changes = tuple(sorted((field, value) for field, value in row.items() if field != "id"))
+            groups.setdefault(changes, []).append(row["id"])
+
+        for changes, task_ids in groups.items():
+            supabase.table("daily_tasks")\
+                .update(dict(changes, updated_at=now))\
+                .in_("id", task_ids)\
+                .execute()
+
+        logger.info("Bulk updated %d tasks in %d requests", len(rows), len(groups))
+        return True
+
+    except Exception as e:
+        logger.error("Error bulk updating tasks: %s", e)
+        return False
+
+
+@profiled("db")
+def delete_tasks(task_ids: List[str]) -> bool:
+    """
+    複数タスクを1回のリクエストで物理削除
+
+    Args:
+        task_ids: タスクIDのリスト
+
+    Returns:
+        成功時True
+    """
+    if not task_ids:
+        return True
+
+    try:
+        supabase.table("daily_tasks")\
+            .delete()\
+            .in_("id", task_ids)\
+            .execute()
+
+        logger.info("Deleted %d tasks", len(task_ids))
+        return True
+
+    except Exception as e:
+        logger.error("Error deleting tasks: %s", e)
+        return False
+
+
+@profiled("db")
 def get_task_completion_rate(user_id: str, task_date: str) -> float:
     """
     指定日のタスク完了率を計算
@@ -214,10 +546,348 @@ def get_task_completion_rate(user_id: str, task_date: str) -> float:
             return 0.0
 
         total = len(tasks)
-        completed = len([t for t in tasks if t["is_completed"]])
+        completed = sum(1 for t in tasks if t.is_completed)
 
         return completed / total
 
     except Exception as e:
         logger.error("Error calculating completion rate: %s", e)
         return 0.0
+
+
+@profiled("db")
+def create_pomodoro_session(
+    user_id: str,
+    session_type: str,
+    duration_minutes: int,
+    task_id: Optional[str] = None,
+) -> Optional[Dict]:
+    """
+    ポモドーロセッションの開始を記録
+
+    Args:
+        user_id: ユーザーID
+        session_type: セッション種別（'work', 'short_break', 'long_break'）
+        duration_minutes: セッション時間（分）
+        task_id: 紐づけるタスクID（任意）
+
+    Returns:
+        作成されたセッション。失敗時はNone。
+    """
+    try:
+        response = supabase.table("pomodoro_sessions")\
+            .insert({
+                "user_id": user_id,
+                "task_id": task_id,
+                "session_type": session_type,
+                "duration_minutes": duration_minutes,
+                "started_at": datetime.now().astimezone().isoformat(),
+            })\
+            .execute()
+
+        logger.info("Started pomodoro session: %s", response.data[0]["id"])
+        return response.data[0] if response.data else None
+
+    except Exception as e:
+        logger.error("Error creating pomodoro session: %s", e)
+        return None
+
+
+@profiled("db")
+def complete_pomodoro_session(session_id: str) -> bool:
+    """
+    ポモドーロセッションの完了を記録
+
+    集中時間の集計（task_focus_stats, daily_focus_stats）は
+    DBトリガーが完了時に1回だけ加算する。
+
+    Args:
+        session_id: セッションID
+
+    Returns:
+        成功時True
+    """
+    try:
+        supabase.table("pomodoro_sessions")\
+            .update({
+                "completed": True,
+                "ended_at": datetime.now().astimezone().isoformat(),
+            })\
+            .eq("id", session_id)\
+            .eq("completed", False)\
+            .execute()
+
+        logger.info("Completed pomodoro session: %s", session_id)
+        return True
+
+    except Exception as e:
+        logger.error("Error completing pomodoro session %s: %s", session_id, e)
+        return False
+
+
+def _fetch_focus_minutes_by_tasks(task_ids: List[str]) -> Dict[str, int]:
+    """複数タスクの累計集中時間をDBから取得（失敗時は例外を送出）"""
+    response = supabase.table("task_focus_stats")\
+        .select("task_id, focus_minutes")\
+        .in_("task_id", task_ids)\
+        .execute()
+
+    return {row["task_id"]: row["focus_minutes"] for row in response.data}
+
+
+@profiled("db")
+def get_focus_minutes_by_tasks_with_status(
+    task_ids: List[str], timeout: Optional[float] = None
+) -> ReadResult:
+    """
+    複数タスクの累計集中時間を、古いデータかどうかの情報付きで取得
+
+    Args:
+        task_ids: タスクIDのリスト
+        timeout: 待ち時間の上限（秒）。省略時は既定値。
+
+    Returns:
+        valueがタスクIDをキー、累計集中時間（分）を値とする辞書の読み込み結果
+    """
+    if not task_ids:
+        return ReadResult({}, False, datetime.now())
+
+    task_ids = sorted(task_ids)
+    return resilient_read(
+        ("task_focus", tuple(task_ids)), _fetch_focus_minutes_by_tasks, (task_ids,),
+        default={}, timeout=timeout,
+    )
+
+
+def get_focus_minutes_by_tasks(task_ids: List[str]) -> Dict[str, int]:
+    """
+    複数タスクの累計集中時間を1回のクエリで取得
+
+    Args:
+        task_ids: タスクIDのリスト
+
+    Returns:
+        タスクIDをキー、累計集中時間（分）を値とする辞書。
+        集中記録のないタスクは含まれない。
+    """
+    return get_focus_minutes_by_tasks_with_status(task_ids).value
+
+
+def _fetch_daily_focus_minutes(
+    user_id: str, start_date: str, end_date: str
+) -> Dict[str, int]:
+    """期間内の日別集中時間をDBから取得（失敗時は例外を送出）"""
+    response = supabase.table("daily_focus_stats")\
+        .select("stat_date, focus_minutes")\
+        .eq("user_id", user_id)\
+        .gte("stat_date", start_date)\
+        .lte("stat_date", end_date)\
+        .execute()
+
+    return {row["stat_date"]: row["focus_minutes"] for row in response.data}
+
+
+@profiled("db")
+def get_daily_focus_minutes_with_status(
+    user_id: str, start_date: str, end_date: str, timeout: Optional[float] = None
+) -> ReadResult:
+    """
+    期間内の日別集中時間を、古いデータかどうかの情報付きで取得
+
+    Args:
+        user_id: ユーザーID
+        start_date: 開始日（YYYY-MM-DD形式）
+        end_date: 終了日（YYYY-MM-DD形式、この日を含む）
+        timeout: 待ち時間の上限（秒）。省略時は既定値。
+
+    Returns:
+        valueが日付をキー、集中時間（分）を値とする辞書の読み込み結果
+    """
+    return resilient_read(
+        ("daily_focus", user_id, start_date, end_date), _fetch_daily_focus_minutes,
+        (user_id, start_date, end_date), default={}, timeout=timeout,
+    )
+
+
+def get_daily_focus_minutes(
+    user_id: str, start_date: str, end_date: str
+) -> Dict[str, int]:
+    """
+    期間内の日別集中時間を取得
+
+    Args:
+        user_id: ユーザーID
+        start_date: 開始日（YYYY-MM-DD形式）
+        end_date: 終了日（YYYY-MM-DD形式、この日を含む）
+
+    Returns:
+        日付をキー、集中時間（分）を値とする辞書。
+        記録のない日は含まれない。
+    """
+    return get_daily_focus_minutes_with_status(user_id, start_date, end_date).value
+
+
+@profiled("db")
+def get_habit_records(
+    user_id: str, start_date: str, end_date: str
+) -> Dict[str, Dict]:
+    """
+    期間内の習慣記録を1回のクエリで取得
+
+    Args:
+        user_id: ユーザーID
+        start_date: 開始日（YYYY-MM-DD形式）
+        end_date: 終了日（YYYY-MM-DD形式、この日を含む）
+
+    Returns:
+        日付をキー、習慣記録を値とする辞書。記録のない日は含まれない。
+    """
+    try:
+        response = supabase.table("habit_records")\
+            .select("*")\
+            .eq("user_id", user_id)\
+            .gte("record_date", start_date)\
+            .lte("record_date", end_date)\
+            .execute()
+
+        return {row["record_date"]: row for row in response.data}
+
+    except Exception as e:
+        logger.error("Error fetching habit records: %s", e)
+        return {}
+
+
+@profiled("db")
+def upsert_habit_records(user_id: str, changes: Dict[str, Dict]) -> bool:
+    """
+    複数日分の習慣記録の変更をまとめてupsert
+
+    (user_id, record_date)で既存レコードを更新し、なければ作成する。
+    送信したフィールドのみ更新されるため、同じフィールド構成の日付ごとに
+    1リクエストへまとめる（通常は1リクエスト）。
+
+    Args:
+        user_id: ユーザーID
+        changes: 日付（YYYY-MM-DD形式）をキー、変更フィールドの辞書を値とする辞書
+
+    Returns:
+        成功時True
+    """
+    if not changes:
+        return True
+
+    try:
+        now = datetime.now().isoformat()
+        groups: Dict[frozenset, List[Dict]] = {}
+        for record_date, fields in changes.items():
+            row = dict(fields, user_id=user_id, record_date=record_date, updated_at=now)
+            groups.setdefault(frozenset(row), []).append(row)
+
+        for rows in groups.values():
+            supabase.table("habit_records")\
+                .upsert(rows, on_conflict="user_id,record_date")\
+                .execute()
+
+        logger.info("Upserted habit records for %d days", len(changes))
+        return True
+
+    except Exception as e:
+        logger.error("Error upserting habit records: %s", e)
+        return False
+
+
+@profiled("db")
+def search(user_id: str, query: str, limit: int = 20, offset: int = 0) -> List[Dict]:
+    """
+    タスク（タイトル・説明）と日記（全項目）を横断して全文検索
+
+    サーバー側のトライグラム索引（search_user_content関数）で検索し、
+    関連度の高い順に返す。
+
+    Args:
+        user_id: ユーザーID
+        query: 検索語
+        limit: 取得件数（最大MAX_SEARCH_RESULTS件）
+        offset: 取得開始位置（ページング用）
+
+    Returns:
+        検索結果のリスト（source, id, entry_date, title, snippet, rank）。
+        sourceは'task'または'journal'。
+    """
+    normalized = unicodedata.normalize("NFKC", query).strip()
+    if not normalized:
+        return []
+
+    try:
+        response = supabase.rpc("search_user_content", {
+            "p_user_id": user_id,
+            "p_query": normalized,
+            "p_limit": min(limit, MAX_SEARCH_RESULTS),
+            "p_offset": max(offset, 0),
+        }).execute()
+
+        return response.data
+
+    except Exception as e:
+        logger.error("Error searching content: %s", e)
+        return []
+
+
+@profiled("db")
+def get_notification_settings(user_id: str) -> Optional[Dict]:
+    """
+    通知設定を取得
+
+    Args:
+        user_id: ユーザーID
+
+    Returns:
+        通知設定。未登録または失敗時はNone。
+    """
+    try:
+        response = supabase.table("notification_settings")\
+            .select("*")\
+            .eq("user_id", user_id)\
+            .limit(1)\
+            .execute()
+
+        return response.data[0] if response.data else None
+
+    except Exception as e:
+        logger.error("Error fetching notification settings: %s", e)
+        return None
+
+
+@profiled("db")
+def update_notification_settings(user_id: str, updates: Dict) -> Optional[Dict]:
+    """
+    通知設定を更新（未登録なら作成）
+
+    保存後、このプロセスで配信エンジンが動いていれば、
+    このユーザーのリマインダー予定だけを組み直す。
+
+    Args:
+        user_id: ユーザーID
+        updates: 更新内容の辞書
+
+    Returns:
+        更新後の通知設定。失敗時はNone。
+    """
+    try:
+        payload = dict(updates, user_id=user_id, updated_at=datetime.now().isoformat())
+
+        response = supabase.table("notification_settings")\
+            .upsert(payload, on_conflict="user_id")\
+            .execute()
+
+        settings = response.data[0] if response.data else None
+        engine = get_reminder_engine()
+        if settings and engine is not None:
+            engine.update_settings(settings)
+
+        logger.info("Updated notification settings: %s", user_id)
+        return settings
+
+    except Exception as e:
+        logger.error("Error updating notification settings: %s", e)
+        return None
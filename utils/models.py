@@ -0,0 +1,166 @@
+"""
+データモデル定義
+
+PostgRESTのレスポンス（dict）を型付きのレコードに変換して扱う。
+Taskは__slots__で属性を固定し、dictに比べて1件あたりのメモリ使用量と
+属性参照のコストを抑える（多数の日付分をキャッシュする場合に効く）。
+
+主要機能:
+- Priority: タスク優先度（並び順のrankを持つ列挙型）
+- Task: デイリータスク
+"""
+
+import sys
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class Priority(str, Enum):
+    """
+    タスク優先度
+
+    値はDBの文字列（'high'等）と同じで、rankは並び順（小さいほど優先）。
+    """
+
+    HIGH = ("high", 0)
+    MEDIUM = ("medium", 1)
+    LOW = ("low", 2)
+
+    def __new__(cls, value: str, rank: int) -> "Priority":
+        member = str.__new__(cls, value)
+        member._value_ = value
+        member.rank = rank
+        return member
+
+    @classmethod
+    def parse(cls, value: Optional[str]) -> "Priority":
+        """
+        DBの値から優先度を取得
+
+        Args:
+            value: 'high', 'medium', 'low' のいずれか
+
+        Returns:
+            優先度。不明な値の場合はMEDIUM。
+        """
+        try:
+            return cls(value)
+        except ValueError:
+            return cls.MEDIUM
+
+
+class Task:
+    """デイリータスク（daily_tasksの1行）"""
+
+    __slots__ = (
+        "id",
+        "user_id",
+        "title",
+        "description",
+        "category",
+        "priority",
+        "is_completed",
+        "task_date",
+        "completed_at",
+        "display_order",
+        "routine_id",
+        "created_at",
+        "updated_at",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        user_id: str,
+        title: str,
+        description: Optional[str] = None,
+        category: Optional[str] = None,
+        priority: Priority = Priority.MEDIUM,
+        is_completed: bool = False,
+        task_date: str = "",
+        completed_at: Optional[str] = None,
+        display_order: int = 0,
+        routine_id: Optional[str] = None,
+        created_at: str = "",
+        updated_at: str = "",
+    ):
+        self.id = id
+        self.user_id = user_id
+        self.title = title
+        self.description = description
+        self.category = category
+        self.priority = priority
+        self.is_completed = is_completed
+        self.task_date = task_date
+        self.completed_at = completed_at
+        self.display_order = display_order
+        self.routine_id = routine_id
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "Task":
+        """
+        DBの行（dict）からTaskを生成
+
+        繰り返し現れるカテゴリ・日付の文字列はinternして共有し、
+        キャッシュ時のメモリ使用量を抑える。
+
+        Args:
+            row: daily_tasksの行
+
+        Returns:
+            Task
+        """
+        task = cls.__new__(cls)
+        task.id = row["id"]
+        task.user_id = row["user_id"]
+        task.title = row["title"]
+        task.description = row.get("description")
+        category = row.get("category")
+        task.category = sys.intern(category) if category else category
+        task.priority = Priority.parse(row.get("priority"))
+        task.is_completed = bool(row.get("is_completed"))
+        task.task_date = sys.intern(row.get("task_date") or "")
+        task.completed_at = row.get("completed_at")
+        task.display_order = row.get("display_order") or 0
+        task.routine_id = row.get("routine_id")
+        task.created_at = row.get("created_at") or ""
+        task.updated_at = row.get("updated_at") or ""
+        return task
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]]) -> List["Task"]:
+        """DBの行のリストからTaskのリストを生成"""
+        from_row = cls.from_row
+        return [from_row(row) for row in rows]
+
+    def to_row(self) -> Dict[str, Any]:
+        """
+        DBへ書き込むための辞書に変換
+
+        Returns:
+            daily_tasksの行
+        """
+        row = {name: getattr(self, name) for name in self.__slots__}
+        row["priority"] = self.priority.value
+        return row
+
+    @property
+    def sort_key(self) -> Tuple[bool, int, str]:
+        """一覧の並び順（未完了→優先度の高い順→作成順）"""
+        return (self.is_completed, self.priority.rank, self.created_at)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Task):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Task(id={self.id!r}, title={self.title!r}, is_completed={self.is_completed!r})"
+
+
+# daily_tasksから取得する列（検索用の生成列などは取得しない）
+TASK_COLUMNS = ", ".join(Task.__slots__)
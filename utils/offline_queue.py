@@ -0,0 +1,443 @@
+"""
+オフライン時のタスク変更ログ（ライトアヘッドログ）
+
+Supabaseに接続できない間のタスクの作成・更新・完了切り替え・削除を
+ローカルのSQLiteに順番どおり記録し、画面にはその変更を重ねて表示する。
+接続が戻ったら記録をタスクごとにまとめ、作成・更新・削除をそれぞれ
+1リクエストで送信する（変更の件数に関係なく最大4リクエスト）。
+
+更新・削除は、変更時点で把握していたupdated_atとサーバー側の現在の値を比較し、
+他の端末で先に変更されていた場合は衝突としてサーバー側を優先する。
+
+主要機能:
+- OfflineQueue: 変更ログの保存・読み出し
+- get_offline_queue: 変更ログの取得（プロセス内で1つ）
+- is_backend_unreachable: 接続できないことによる例外か
+- remember_tasks: サーバーで確認済みのタスクの記録（衝突検出の基準）
+- local_task: 未送信の変更を反映したタスク
+- apply_pending: タスク一覧への未送信の変更の反映
+- flush_pending: 未送信の変更の一括送信
+- pop_conflicts: 送信時に検出した衝突の取得
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from operator import attrgetter
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import httpx
+from supabase import Client
+
+from utils.constants import LOCAL_STATE_DIR, OFFLINE_KNOWN_TASKS_MAX
+from utils.models import Task, TASK_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+OP_CREATE = "create"
+OP_UPDATE = "update"
+OP_DELETE = "delete"
+
+
+class PendingOp(NamedTuple):
+    """未送信の変更"""
+
+    seq: int
+    user_id: str
+    op: str
+    task_id: str
+    payload: Dict
+    base_updated_at: Optional[str]
+    created_at: str
+
+
+class FlushResult(NamedTuple):
+    """一括送信の結果"""
+
+    applied: int
+    conflicts: List[Dict]
+
+
+class OfflineQueue:
+    """
+    SQLiteに保存するタスク変更ログ
+
+    Args:
+        path: SQLiteファイルのパス
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS task_ops (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT NOT NULL,
+                    op TEXT NOT NULL,
+                    task_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    base_updated_at TEXT,
+                    created_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_task_ops_user ON task_ops(user_id, seq)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_task_ops_task ON task_ops(task_id, seq)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """ログDBへの接続（正常終了時にコミットし、必ずクローズする）"""
+        conn = sqlite3.connect(self._path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def append(
+        self,
+        user_id: str,
+        op: str,
+        task_id: str,
+        payload: Optional[Dict] = None,
+        base_updated_at: Optional[str] = None,
+    ) -> int:
+        """
+        変更を記録（コミット後に返るため、プロセスが落ちても失われない）
+
+        Args:
+            user_id: ユーザーID
+            op: 'create', 'update', 'delete' のいずれか
+            task_id: タスクID
+            payload: 作成時はタスクの全列、更新時は変更フィールド
+            base_updated_at: 変更時点で把握していたサーバー側のupdated_at
+
+        Returns:
+            記録の連番
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO task_ops (user_id, op, task_id, payload, base_updated_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    user_id, op, task_id, json.dumps(payload or {}, ensure_ascii=False),
+                    base_updated_at, datetime.now().astimezone().isoformat(),
+                ),
+            )
+            return cursor.lastrowid
+
+    def _select(self, where: str, params: Tuple) -> List[PendingOp]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, user_id, op, task_id, payload, base_updated_at, created_at "
+                f"FROM task_ops WHERE {where} ORDER BY seq",
+                params,
+            ).fetchall()
+        return [
+            PendingOp(seq, user_id, op, task_id, json.loads(payload), base, created_at)
+            for seq, user_id, op, task_id, payload, base, created_at in rows
+        ]
+
+    def pending(self, user_id: str) -> List[PendingOp]:
+        """ユーザーの未送信の変更（記録順）"""
+        return self._select("user_id = ?", (user_id,))
+
+    def pending_for_task(self, task_id: str) -> List[PendingOp]:
+        """タスクの未送信の変更（記録順）"""
+        return self._select("task_id = ?", (task_id,))
+
+    def pending_count(self, user_id: str) -> int:
+        """ユーザーの未送信の変更の件数"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT COUNT(*) FROM task_ops WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0]
+
+    def remove(self, seqs: List[int]) -> None:
+        """送信済みの変更を削除"""
+        if not seqs:
+            return
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM task_ops WHERE seq = ?", [(seq,) for seq in seqs])
+
+
+_queue: Optional[OfflineQueue] = None
+_queue_lock = threading.Lock()
+_flush_lock = threading.Lock()
+
+# サーバーで確認済みのタスク（id -> Task）。更新・削除の衝突検出の基準にする
+_known_tasks: "OrderedDict[str, Task]" = OrderedDict()
+_known_lock = threading.Lock()
+
+_conflicts: Dict[str, List[Dict]] = {}
+
+
+def get_offline_queue() -> OfflineQueue:
+    """
+    変更ログを取得（プロセス内で1つ）
+
+    保存先は MONK_MODE_STATE_DIR（既定 .monk_state）/offline_wal.sqlite3。
+    """
+    global _queue
+
+    with _queue_lock:
+        if _queue is None:
+            state_dir = os.getenv("MONK_MODE_STATE_DIR", LOCAL_STATE_DIR)
+            _queue = OfflineQueue(os.path.join(state_dir, "offline_wal.sqlite3"))
+    return _queue
+
+
+def is_backend_unreachable(error: Exception) -> bool:
+    """接続失敗・タイムアウトなど、サーバーに届かなかったことによる例外か"""
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+def remember_tasks(tasks: List[Task]) -> None:
+    """サーバーから取得・書き込み確認したタスクを記録"""
+    with _known_lock:
+        for task in tasks:
+            _known_tasks[task.id] = task
+            _known_tasks.move_to_end(task.id)
+        while len(_known_tasks) > OFFLINE_KNOWN_TASKS_MAX:
+            _known_tasks.popitem(last=False)
+
+
+def known_task(task_id: str) -> Optional[Task]:
+    """サーバーで確認済みのタスク（未確認ならNone）"""
+    with _known_lock:
+        return _known_tasks.get(task_id)
+
+
+def _fold(ops: List[PendingOp]) -> Tuple[Dict[str, Dict], List[int]]:
+    """
+    記録順の変更をタスクごとの最終状態にまとめる
+
+    - 作成→更新: 変更を反映した作成
+    - 作成→削除: 何も送らない
+    - 更新→更新: 変更フィールドをまとめた更新（基準は最初の更新時点）
+    - 更新→削除: 削除
+
+    Returns:
+        （タスクIDをキー、{"op", "fields", "base", "seqs"}を値とする辞書, まとめた変更の連番のリスト）
+        各状態の"seqs"はその状態にまとめた変更の連番。作成→削除で打ち消した変更は
+        どの状態にも含まれない。
+    """
+    states: Dict[str, Dict] = {}
+    seqs: List[int] = []
+
+    for op in ops:
+        seqs.append(op.seq)
+        state = states.get(op.task_id)
+        prior = state["seqs"] if state is not None else []
+
+        if op.op == OP_CREATE:
+            states[op.task_id] = {
+                "op": OP_CREATE, "fields": dict(op.payload), "base": None, "seqs": prior + [op.seq],
+            }
+        elif op.op == OP_UPDATE:
+            if state is None:
+                states[op.task_id] = {
+                    "op": OP_UPDATE, "fields": dict(op.payload), "base": op.base_updated_at,
+                    "seqs": [op.seq],
+                }
+            else:
+                if state["op"] != OP_DELETE:
+                    state["fields"].update(op.payload)
+                state["seqs"].append(op.seq)
+        elif op.op == OP_DELETE:
+            if state is not None and state["op"] == OP_CREATE:
+                del states[op.task_id]
+            else:
+                base = state["base"] if state is not None else op.base_updated_at
+                states[op.task_id] = {
+                    "op": OP_DELETE, "fields": {}, "base": base, "seqs": prior + [op.seq],
+                }
+
+    return states, seqs
+
+
+def _apply_state(task: Optional[Task], state: Dict) -> Optional[Task]:
+    """タスクに最終状態を反映（削除ならNone）"""
+    if state["op"] == OP_DELETE:
+        return None
+    if state["op"] == OP_CREATE:
+        return Task.from_row(state["fields"])
+    if task is None:
+        return None
+    return Task.from_row(dict(task.to_row(), **state["fields"]))
+
+
+def local_task(task_id: str) -> Optional[Task]:
+    """
+    未送信の変更を反映したタスクを取得
+
+    Returns:
+        タスク。確認済みでもオフライン作成でもない・削除済みの場合はNone。
+    """
+    states, _ = _fold(get_offline_queue().pending_for_task(task_id))
+    task = known_task(task_id)
+    if task_id not in states:
+        return task
+    return _apply_state(task, states[task_id])
+
+
+def apply_pending(tasks: List[Task], ops: List[PendingOp], task_date: str) -> List[Task]:
+    """
+    指定日のタスク一覧に未送信の変更を反映
+
+    Args:
+        tasks: サーバー（またはキャッシュ）から取得したタスクのリスト
+        ops: ユーザーの未送信の変更
+        task_date: 対象日付（YYYY-MM-DD形式）
+
+    Returns:
+        変更を反映し、一覧の並び順にソートしたタスクのリスト
+    """
+    states, _ = _fold(ops)
+    by_id = {task.id: task for task in tasks}
+
+    for task_id, state in states.items():
+        if state["op"] == OP_CREATE and state["fields"].get("task_date") != task_date:
+            continue
+        task = _apply_state(by_id.get(task_id), state)
+        if task is None:
+            by_id.pop(task_id, None)
+        else:
+            by_id[task_id] = task
+
+    return sorted(by_id.values(), key=attrgetter("sort_key"))
+
+
+def flush_pending(client: Client, user_id: str) -> FlushResult:
+    """
+    ユーザーの未送信の変更をまとめて送信
+
+    タスクごとに最終状態へまとめたうえで、
+    1. 更新・削除対象の現在の行を1回のクエリで取得し、updated_atで衝突を検出
+    2. 作成を1回のupsertで送信（再送しても重複しない）
+    3. 更新をサーバーの行に変更を重ねた全列の1回のupsertで送信
+    4. 削除を1回のクエリで送信
+    の順に実行し、段階ごとに完了した変更をログから削除する。途中で失敗しても
+    送信済みの変更は再送されないため、自分の更新を衝突と誤検出しない。
+    応答が失われるなどして送信済みか分からない更新も、サーバーの行が変更内容と
+    一致していれば反映済みとみなす。
+    衝突したタスクはサーバー側を優先し、pop_conflictsで取得できるよう記録する。
+
+    Args:
+        client: 使用するクライアント
+        user_id: ユーザーID
+
+    Returns:
+        送信結果
+
+    Raises:
+        Exception: 送信に失敗した場合（ログは残り、次回に再送される）
+    """
+    with _flush_lock:
+        queue = get_offline_queue()
+        ops = queue.pending(user_id)
+        if not ops:
+            return FlushResult(0, [])
+
+        states, seqs = _fold(ops)
+
+        check_ids = [task_id for task_id, state in states.items() if state["op"] != OP_CREATE]
+        server_rows: Dict[str, Dict] = {}
+        if check_ids:
+            response = client.table("daily_tasks")\
+                .select(TASK_COLUMNS)\
+                .in_("id", check_ids)\
+                .execute()
+            server_rows = {row["id"]: row for row in response.data}
+
+        now = datetime.now().isoformat()
+        creates: List[Dict] = []
+        updates: List[Dict] = []
+        deletes: List[str] = []
+        conflicts: List[Dict] = []
+        # 作成→削除で打ち消した変更は送信不要
+        settled = sorted(set(seqs) - {seq for state in states.values() for seq in state["seqs"]})
+        create_seqs: List[int] = []
+        update_seqs: List[int] = []
+        delete_seqs: List[int] = []
+
+        for task_id, state in states.items():
+            if state["op"] == OP_CREATE:
+                creates.append(state["fields"])
+                create_seqs.extend(state["seqs"])
+                continue
+
+            row = server_rows.get(task_id)
+            if row is None:
+                # 他の端末で削除済み（削除ならそのまま完了とみなす）
+                if state["op"] == OP_UPDATE:
+                    conflicts.append({"task_id": task_id, "op": OP_UPDATE, "title": None, "reason": "deleted"})
+                settled.extend(state["seqs"])
+                continue
+
+            if state["base"] is not None and row["updated_at"] != state["base"]:
+                if state["op"] == OP_UPDATE and all(
+                    row.get(field) == value for field, value in state["fields"].items()
+                ):
+                    # 前回の送信が反映済み（応答だけ失われた場合など）
+                    settled.extend(state["seqs"])
+                    continue
+                conflicts.append({
+                    "task_id": task_id, "op": state["op"], "title": row["title"], "reason": "modified",
+                })
+                settled.extend(state["seqs"])
+                continue
+
+            if state["op"] == OP_UPDATE:
+                merged = dict(row)
+                merged.update(state["fields"])
+                merged["updated_at"] = now
+                updates.append(merged)
+                update_seqs.extend(state["seqs"])
+            else:
+                deletes.append(task_id)
+                delete_seqs.extend(state["seqs"])
+
+        queue.remove(settled)
+        if conflicts:
+            _conflicts.setdefault(user_id, []).extend(conflicts)
+            logger.warning("Discarded %d offline task changes due to conflicts", len(conflicts))
+
+        if creates:
+            client.table("daily_tasks")\
+                .upsert(creates, on_conflict="id", ignore_duplicates=True)\
+                .execute()
+            queue.remove(create_seqs)
+
+        if updates:
+            response = client.table("daily_tasks")\
+                .upsert(updates, on_conflict="id")\
+                .execute()
+            queue.remove(update_seqs)
+            remember_tasks(Task.from_rows(response.data))
+
+        if deletes:
+            client.table("daily_tasks")\
+                .delete()\
+                .in_("id", deletes)\
+                .execute()
+            queue.remove(delete_seqs)
+
+        applied = len(creates) + len(updates) + len(deletes)
+        logger.info("Flushed %d offline task changes (%d queued ops)", applied, len(seqs))
+        return FlushResult(applied, conflicts)
+
+
+def pop_conflicts(user_id: str) -> List[Dict]:
+    """
+    送信時に検出した衝突を取得して消去
+
+    Returns:
+        task_id, op, title（サーバー側の現在のタイトル。削除済みならNone）, reasonの辞書のリスト
+    """
+    return _conflicts.pop(user_id, [])
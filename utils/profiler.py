@@ -0,0 +1,199 @@
+"""
+rerunプロファイラ
+
+ページスクリプト1回の実行（rerun）の所要時間を、DB呼び出し・ウィジェット描画・
+その他のPython処理に分解して計測する。プロファイリングが無効な間は、
+計測用デコレータは関数をそのまま呼び出すだけで、ほぼオーバーヘッドはない。
+
+計測区間はネストでき、各区間には子区間を除いた時間（自己時間）のみ計上する。
+（例: 描画中のコールバックで発生したDB呼び出しは「DB」に計上される）
+
+主要機能:
+- begin_rerun_profile: rerunの計測開始
+- finish_rerun_profile: rerunの計測終了
+- profile_section: 区間計測のコンテキストマネージャ
+- profiled: 区間計測のデコレータ
+
+環境変数:
+- MONK_MODE_PROFILE=1: 全ページでプロファイリングを有効化
+- MONK_MODE_PROFILE_DIR=<dir>: cProfileの結果（.prof）を保存するディレクトリ
+  （snakeviz や flameprof でフレームグラフ表示できる）
+"""
+
+import cProfile
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+PROFILE_CATEGORIES = ("db", "render")
+
+F = TypeVar("F", bound=Callable)
+
+# Streamlitはセッションごとに別スレッドでスクリプトを実行するため、スレッド単位で保持する
+_local = threading.local()
+
+
+def is_profiling_enabled_by_env() -> bool:
+    """環境変数でプロファイリングが有効化されているか"""
+    return os.getenv("MONK_MODE_PROFILE", "").lower() in ("1", "true", "yes")
+
+
+class RerunProfile:
+    """1回のrerunの計測結果"""
+
+    def __init__(self, page: str, use_cprofile: bool = False):
+        self.page = page
+        self.started_at = time.perf_counter()
+        self.wall_seconds = 0.0
+        self.totals: Dict[str, float] = {category: 0.0 for category in PROFILE_CATEGORIES}
+        self.counts: Dict[str, int] = {category: 0 for category in PROFILE_CATEGORIES}
+        self.dump_path: Optional[str] = None
+        # [カテゴリ, 開始時刻, 子区間の合計時間]
+        self._stack: List[list] = []
+        self._cprofile = cProfile.Profile() if use_cprofile else None
+
+    @property
+    def other_seconds(self) -> float:
+        """DB・描画以外のPython処理時間"""
+        return max(self.wall_seconds - sum(self.totals.values()), 0.0)
+
+    def enter(self, category: str) -> None:
+        """区間の開始"""
+        self._stack.append([category, time.perf_counter(), 0.0])
+
+    def exit(self) -> None:
+        """区間の終了（自己時間を計上し、親区間へ経過時間を伝える）"""
+        category, started, child_seconds = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        self.totals[category] += elapsed - child_seconds
+        self.counts[category] += 1
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def to_dict(self) -> Dict:
+        """パネル表示・履歴保存用の辞書に変換"""
+        return {
+            "page": self.page,
+            "wall_ms": self.wall_seconds * 1000,
+            "db_ms": self.totals["db"] * 1000,
+            "db_calls": self.counts["db"],
+            "render_ms": self.totals["render"] * 1000,
+            "other_ms": self.other_seconds * 1000,
+            "dump_path": self.dump_path,
+        }
+
+
+def current_profile() -> Optional[RerunProfile]:
+    """
+    実行中のrerunの計測結果を取得
+
+    Returns:
+        計測中ならRerunProfile、無効ならNone
+    """
+    return getattr(_local, "profile", None)
+
+
+def begin_rerun_profile(page: str) -> RerunProfile:
+    """
+    rerunの計測を開始
+
+    前回のrerunがst.rerun()等で中断され計測が残っている場合は破棄する。
+
+    Args:
+        page: ページ名
+
+    Returns:
+        計測中のRerunProfile
+    """
+    previous = current_profile()
+    if previous is not None and previous._cprofile is not None:
+        previous._cprofile.disable()
+
+    profile = RerunProfile(page, use_cprofile=bool(os.getenv("MONK_MODE_PROFILE_DIR")))
+    _local.profile = profile
+    if profile._cprofile is not None:
+        profile._cprofile.enable()
+    return profile
+
+
+def finish_rerun_profile() -> Optional[RerunProfile]:
+    """
+    rerunの計測を終了
+
+    MONK_MODE_PROFILE_DIRが設定されている場合はcProfileの結果を保存する。
+
+    Returns:
+        計測結果。計測していなかった場合はNone。
+    """
+    profile = current_profile()
+    if profile is None:
+        return None
+
+    _local.profile = None
+    profile.wall_seconds = time.perf_counter() - profile.started_at
+
+    if profile._cprofile is not None:
+        profile._cprofile.disable()
+        dump_dir = os.getenv("MONK_MODE_PROFILE_DIR")
+        try:
+            os.makedirs(dump_dir, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            profile.dump_path = os.path.join(dump_dir, f"{profile.page}_{timestamp}.prof")
+            profile._cprofile.dump_stats(profile.dump_path)
+        except OSError as e:
+            logger.error("Error dumping profile: %s", e)
+
+    logger.debug("Rerun profile: %s", profile.to_dict())
+    return profile
+
+
+@contextmanager
+def profile_section(category: str) -> Iterator[None]:
+    """
+    区間の処理時間を指定カテゴリに計上する
+
+    Args:
+        category: 計上先カテゴリ（"db" または "render"）
+    """
+    profile = current_profile()
+    if profile is None:
+        yield
+        return
+
+    profile.enter(category)
+    try:
+        yield
+    finally:
+        profile.exit()
+
+
+def profiled(category: str) -> Callable[[F], F]:
+    """
+    関数の処理時間を指定カテゴリに計上するデコレータ
+
+    Args:
+        category: 計上先カテゴリ（"db" または "render"）
+    """
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = getattr(_local, "profile", None)
+            if profile is None:
+                return func(*args, **kwargs)
+
+            profile.enter(category)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.exit()
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,496 @@
+"""
+リマインダー配信エンジン
+
+notification_settingsに基づく各種リマインダー（就寝・水分補給・タスク・ルーティン）を
+次回発火時刻の最小ヒープで管理する。毎分全ユーザーの設定を走査するのではなく、
+ヒープの先頭が現在時刻を過ぎたものだけを取り出して配信するため、
+予定の追加・取り出しは1件あたりO(log n)で済む。
+
+時刻はすべてAPP_TIMEZONEのタイムゾーン付きで扱うため、サーバーのタイムゾーン
+（UTCのホストなど）によらず設定した時刻に発火する。通知設定の行がないユーザーは
+DBの既定値（DEFAULT_SETTINGS）で予定する。
+
+設定変更時はそのユーザーの予定だけを組み直す。古い予定はヒープから即座には
+削除せず、ユーザーごとの世代番号で無効化し、取り出し時に読み飛ばす（遅延削除）。
+無効な予定が有効な予定より多くなった時点でヒープを再構築する。
+
+主要機能:
+- Reminder: 配信するリマインダー
+- ReminderSink / LoggingSink / InMemorySink: 配信先
+- ReminderEngine: 予定の管理と配信
+- default_settings: 通知設定の行がないユーザーの設定
+- to_app_time: APP_TIMEZONEの時刻への変換（省略時は現在時刻）
+- ensure_reminder_engine_started: 配信エンジンの開始（プロセス内で1回）
+- get_reminder_engine: 起動中の配信エンジンの取得
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Dict, List, NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+from supabase import Client
+
+from utils.constants import (
+    APP_TIMEZONE,
+    REMINDER_PAGE_SIZE,
+    REMINDER_POLL_SECONDS,
+    ROUTINE_REMINDER_TIME,
+    TASK_REMINDER_TIME,
+    WATER_REMINDER_END_HOUR,
+    WATER_REMINDER_START_HOUR,
+)
+from utils.supabase_client import SUPABASE_SERVICE_ROLE_KEY, get_admin_client
+
+logger = logging.getLogger(__name__)
+
+APP_TZ = ZoneInfo(APP_TIMEZONE)
+
+REMINDER_MESSAGES = {
+    "sleep": "🌙 就寝の準備をしましょう",
+    "water": "💧 水分補給の時間です",
+    "task": "📋 今日のタスクを確認しましょう",
+    "routine": "🔁 今日のルーティンを始めましょう",
+}
+
+SETTINGS_COLUMNS = (
+    "id, user_id, task_reminders_enabled, routine_reminders_enabled, "
+    "sleep_reminder_enabled, water_reminder_enabled, "
+    "sleep_reminder_time, water_reminder_interval_hours"
+)
+
+# notification_settingsの列の既定値（行がないユーザーに使用）
+DEFAULT_SETTINGS = {
+    "task_reminders_enabled": True,
+    "routine_reminders_enabled": True,
+    "sleep_reminder_enabled": True,
+    "water_reminder_enabled": True,
+    "sleep_reminder_time": "22:30:00",
+    "water_reminder_interval_hours": 2,
+}
+
+
+class Reminder(NamedTuple):
+    """配信するリマインダー"""
+
+    user_id: str
+    kind: str
+    fire_at: datetime
+    message: str
+
+
+class ReminderSink:
+    """リマインダーの配信先（send を実装する）"""
+
+    def send(self, reminder: Reminder) -> None:
+        raise NotImplementedError
+
+
+class LoggingSink(ReminderSink):
+    """ログ出力のみ行う配信先（ローカル開発用）"""
+
+    def send(self, reminder: Reminder) -> None:
+        logger.info("Reminder %s for %s at %s", reminder.kind, reminder.user_id, reminder.fire_at)
+
+
+class InMemorySink(ReminderSink):
+    """配信したリマインダーをリストに保持する配信先（テスト用）"""
+
+    def __init__(self):
+        self.sent: List[Reminder] = []
+
+    def send(self, reminder: Reminder) -> None:
+        self.sent.append(reminder)
+
+
+def default_settings(user_id: str) -> Dict:
+    """
+    通知設定の行がないユーザーの設定（DBの既定値）
+
+    Args:
+        user_id: ユーザーID
+
+    Returns:
+        notification_settingsの行と同じ形の辞書
+    """
+    return dict(DEFAULT_SETTINGS, user_id=user_id)
+
+
+def to_app_time(moment: Optional[datetime] = None) -> datetime:
+    """APP_TIMEZONEの時刻に変換（省略時は現在時刻、タイムゾーンなしはAPP_TIMEZONEとみなす）"""
+    if moment is None:
+        return datetime.now(APP_TZ)
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=APP_TZ)
+    return moment.astimezone(APP_TZ)
+
+
+def _parse_time(value: str) -> dt_time:
+    """'HH:MM' または 'HH:MM:SS' を時刻に変換"""
+    return dt_time.fromisoformat(value)
+
+
+def _next_daily(after: datetime, at: dt_time) -> datetime:
+    """afterより後の、毎日at時刻（APP_TIMEZONE）の次回発火時刻"""
+    after = to_app_time(after)
+    candidate = datetime.combine(after.date(), at, tzinfo=APP_TZ)
+    if candidate <= after:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def _next_water(after: datetime, interval_hours: int) -> datetime:
+    """
+    afterより後の水分補給リマインダーの次回発火時刻
+
+    WATER_REMINDER_START_HOUR時から interval_hours 時間ごと、
+    WATER_REMINDER_END_HOUR時までの間に発火する。
+    """
+    after = to_app_time(after)
+    interval_hours = max(interval_hours, 1)
+    day: date = after.date()
+    for _ in range(2):
+        start = datetime.combine(day, dt_time(WATER_REMINDER_START_HOUR), tzinfo=APP_TZ)
+        end = datetime.combine(day, dt_time(WATER_REMINDER_END_HOUR), tzinfo=APP_TZ)
+        if after < start:
+            return start
+        if after < end:
+            elapsed_hours = (after - start) // timedelta(hours=interval_hours) + 1
+            candidate = start + timedelta(hours=interval_hours * elapsed_hours)
+            if candidate <= end:
+                return candidate
+        day += timedelta(days=1)
+    return datetime.combine(day, dt_time(WATER_REMINDER_START_HOUR), tzinfo=APP_TZ)
+
+
+def next_fire_at(kind: str, settings: Dict, after: datetime) -> datetime:
+    """
+    リマインダー種別ごとの次回発火時刻
+
+    Args:
+        kind: 'sleep', 'water', 'task', 'routine' のいずれか
+        settings: notification_settingsの行
+        after: 基準時刻（これより後の時刻を返す。タイムゾーンなしはAPP_TIMEZONEとみなす）
+
+    Returns:
+        次回発火時刻（APP_TIMEZONE）
+    """
+    if kind == "sleep":
+        sleep_time = settings.get("sleep_reminder_time") or DEFAULT_SETTINGS["sleep_reminder_time"]
+        return _next_daily(after, _parse_time(sleep_time))
+    if kind == "water":
+        interval_hours = (
+            settings.get("water_reminder_interval_hours")
+            or DEFAULT_SETTINGS["water_reminder_interval_hours"]
+        )
+        return _next_water(after, interval_hours)
+    if kind == "task":
+        return _next_daily(after, _parse_time(TASK_REMINDER_TIME))
+    if kind == "routine":
+        return _next_daily(after, _parse_time(ROUTINE_REMINDER_TIME))
+    raise ValueError(f"Unknown reminder kind: {kind}")
+
+
+def enabled_kinds(settings: Dict) -> List[str]:
+    """設定で有効になっているリマインダー種別"""
+    flags = {
+        "sleep": "sleep_reminder_enabled",
+        "water": "water_reminder_enabled",
+        "task": "task_reminders_enabled",
+        "routine": "routine_reminders_enabled",
+    }
+    # DB既定値はすべてTRUE
+    return [kind for kind, column in flags.items() if settings.get(column, True)]
+
+
+class ReminderEngine:
+    """
+    次回発火時刻の最小ヒープによるリマインダー配信エンジン
+
+    Args:
+        sink: 配信先
+    """
+
+    def __init__(self, sink: Optional[ReminderSink] = None):
+        self._sink = sink or LoggingSink()
+        # (発火時刻, 連番, ユーザーID, 種別, 世代)
+        self._heap: List[tuple] = []
+        self._settings: Dict[str, Dict] = {}
+        self._generations: Dict[str, int] = {}
+        self._live_count = 0
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        """有効な予定の件数"""
+        return self._live_count
+
+    def _push(self, user_id: str, kind: str, fire_at: datetime) -> None:
+        entry = (fire_at, next(self._counter), user_id, kind, self._generations[user_id])
+        if self._heap and fire_at < self._heap[0][0]:
+            self._wakeup.set()
+        heapq.heappush(self._heap, entry)
+        self._live_count += 1
+
+    def _invalidate(self, user_id: str) -> None:
+        """ユーザーの既存予定を無効化（ヒープからは遅延削除）"""
+        if user_id in self._settings:
+            self._live_count -= len(enabled_kinds(self._settings[user_id]))
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def _compact_if_needed(self) -> None:
+        """無効な予定が有効な予定より多ければヒープを再構築"""
+        if len(self._heap) > 2 * max(self._live_count, 1):
+            self._heap = [
+                entry for entry in self._heap
+                if self._generations.get(entry[2]) == entry[4] and entry[2] in self._settings
+            ]
+            heapq.heapify(self._heap)
+
+    def update_settings(self, settings: Dict, now: Optional[datetime] = None) -> None:
+        """
+        ユーザーの通知設定を反映し、そのユーザーの予定だけを組み直す
+
+        Args:
+            settings: notification_settingsの行（user_idを含む）
+            now: 基準時刻（省略時は現在時刻。タイムゾーンなしはAPP_TIMEZONEとみなす）
+        """
+        now = to_app_time(now)
+        user_id = settings["user_id"]
+
+        with self._lock:
+            self._invalidate(user_id)
+            self._settings[user_id] = dict(settings)
+            for kind in enabled_kinds(settings):
+                self._push(user_id, kind, next_fire_at(kind, settings, now))
+            self._compact_if_needed()
+
+    def remove_user(self, user_id: str) -> None:
+        """
+        ユーザーの予定をすべて取り消す
+
+        Args:
+            user_id: ユーザーID
+        """
+        with self._lock:
+            self._invalidate(user_id)
+            self._settings.pop(user_id, None)
+            self._compact_if_needed()
+
+    def _add_loaded(self, settings: Dict, now: datetime) -> None:
+        """読み込んだ設定の予定をヒープに追加（heapifyは呼び出し元で行う）"""
+        user_id = settings["user_id"]
+        self._invalidate(user_id)
+        self._settings[user_id] = settings
+        for kind in enabled_kinds(settings):
+            entry = (
+                next_fire_at(kind, settings, now),
+                next(self._counter),
+                user_id,
+                kind,
+                self._generations[user_id],
+            )
+            self._heap.append(entry)
+            self._live_count += 1
+
+    def load_all(self, client: Client, now: Optional[datetime] = None) -> int:
+        """
+        全ユーザーの通知設定を読み込み、予定を一括で構築
+
+        idのキーセットでページングしながら読み込み、最後に1回だけheapifyする。
+        通知設定の行がないユーザー（user_profilesにのみ存在）は既定の設定で予定する。
+
+        Args:
+            client: 使用するクライアント（全ユーザー分はservice_roleキーが必要）
+            now: 基準時刻（省略時は現在時刻。タイムゾーンなしはAPP_TIMEZONEとみなす）
+
+        Returns:
+            読み込んだユーザー数
+        """
+        now = to_app_time(now)
+        loaded = 0
+        last_id = None
+
+        while True:
+            query = client.table("notification_settings")\
+                .select(SETTINGS_COLUMNS)\
+                .order("id")\
+                .limit(REMINDER_PAGE_SIZE)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+
+            rows = query.execute().data
+            if not rows:
+                break
+
+            with self._lock:
+                for settings in rows:
+                    self._add_loaded(settings, now)
+
+            loaded += len(rows)
+            last_id = rows[-1]["id"]
+
+        last_id = None
+        while True:
+            query = client.table("user_profiles")\
+                .select("id")\
+                .order("id")\
+                .limit(REMINDER_PAGE_SIZE)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+
+            rows = query.execute().data
+            if not rows:
+                break
+
+            with self._lock:
+                for row in rows:
+                    if row["id"] not in self._settings:
+                        self._add_loaded(default_settings(row["id"]), now)
+                        loaded += 1
+
+            last_id = rows[-1]["id"]
+
+        with self._lock:
+            heapq.heapify(self._heap)
+            self._compact_if_needed()
+        self._wakeup.set()
+
+        logger.info("Loaded reminder schedules for %d users", loaded)
+        return loaded
+
+    def next_fire_time(self) -> Optional[datetime]:
+        """
+        最も早い予定の発火時刻
+
+        Returns:
+            発火時刻。予定がない場合はNone。
+        """
+        with self._lock:
+            while self._heap:
+                fire_at, _, user_id, _, generation = self._heap[0]
+                if self._generations.get(user_id) == generation and user_id in self._settings:
+                    return fire_at
+                heapq.heappop(self._heap)
+            return None
+
+    def dispatch_due(self, now: Optional[datetime] = None) -> int:
+        """
+        発火時刻を過ぎたリマインダーを配信し、次回分を予定に入れる
+
+        停止中に複数回分の発火時刻を過ぎていても、配信は1回にまとめ、
+        次回は現在時刻以降の時刻で予定する。
+
+        Args:
+            now: 基準時刻（省略時は現在時刻。タイムゾーンなしはAPP_TIMEZONEとみなす）
+
+        Returns:
+            配信した件数
+        """
+        now = to_app_time(now)
+        due: List[Reminder] = []
+
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, _, user_id, kind, generation = heapq.heappop(self._heap)
+                settings = self._settings.get(user_id)
+                if settings is None or self._generations.get(user_id) != generation:
+                    continue
+
+                due.append(Reminder(user_id, kind, fire_at, REMINDER_MESSAGES[kind]))
+                self._live_count -= 1
+                self._push(user_id, kind, next_fire_at(kind, settings, max(fire_at, now)))
+
+        for reminder in due:
+            try:
+                self._sink.send(reminder)
+            except Exception as e:
+                logger.error("Error sending reminder to %s: %s", reminder.user_id, e)
+
+        return len(due)
+
+    def _loop(self, client: Optional[Client]) -> None:
+        if client is not None:
+            try:
+                self.load_all(client)
+            except Exception as e:
+                logger.error("Error loading reminder schedules: %s", e)
+
+        while not self._stop_event.is_set():
+            self.dispatch_due()
+            next_time = self.next_fire_time()
+            wait = REMINDER_POLL_SECONDS
+            if next_time is not None:
+                wait = min(max((next_time - datetime.now(APP_TZ)).total_seconds(), 0.0), wait)
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+
+    def start(self, client: Optional[Client] = None) -> None:
+        """
+        バックグラウンドスレッドで配信を開始
+
+        Args:
+            client: 指定時は配信開始前にこのクライアントで全予定を読み込む
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._loop, args=(client,), name="monk-mode-reminders", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """バックグラウンドスレッドを停止"""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+_engine: Optional[ReminderEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_reminder_engine() -> Optional[ReminderEngine]:
+    """
+    起動中の配信エンジンを取得
+
+    Returns:
+        配信エンジン。起動していない場合はNone。
+    """
+    return _engine
+
+
+def ensure_reminder_engine_started(sink: Optional[ReminderSink] = None) -> Optional[ReminderEngine]:
+    """
+    配信エンジンを開始（プロセス内で1回のみ）
+
+    全ユーザーの通知設定を読むためservice_roleキーが必要。
+    SUPABASE_SERVICE_ROLE_KEYが未設定の環境では何もしない。
+    予定の読み込みは配信スレッド側で行うため、呼び出し元を待たせない。
+
+    Args:
+        sink: 配信先（省略時はLoggingSink）
+
+    Returns:
+        起動した配信エンジン。未設定で起動しない場合はNone。
+    """
+    global _engine
+
+    if not SUPABASE_SERVICE_ROLE_KEY:
+        return None
+
+    with _engine_lock:
+        if _engine is None:
+            engine = ReminderEngine(sink)
+            engine.start(get_admin_client())
+            _engine = engine
+
+    return _engine
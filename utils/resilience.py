@@ -0,0 +1,289 @@
+"""
+DB読み込みの耐障害性モジュール
+
+Supabaseの応答が遅い・失敗する場合でも画面が止まらないよう、読み込みに
+待ち時間の上限（レイテンシ予算）を設ける。上限内に応答がなければ前回正常に
+取得した結果（古いデータ）をすぐに返し、取得自体はバックグラウンドで継続して
+完了時にキャッシュを更新する（stale-while-revalidate）。
+
+失敗が続いた場合はサーキットブレーカーを開き、一定時間はバックエンドへ
+リクエストを送らずにキャッシュだけで応答する。時間経過後は1件だけ試行し、
+成功すれば通常状態に戻す。
+
+主要機能:
+- ReadResult: 読み込み結果（値・古いデータか・取得時刻）
+- CircuitBreaker: サーキットブレーカー
+- resilient_read: 待ち時間上限・キャッシュ・ブレーカー付きの読み込み
+- run_with_budget: 待ち時間上限付きでバックグラウンド処理の完了を待つ
+
+環境変数:
+- MONK_MODE_DB_TIMEOUT=<秒>: 読み込みの待ち時間上限の既定値
+"""
+
+import copy
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from utils.constants import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SECONDS,
+    DB_READ_MAX_WORKERS,
+    DB_READ_TIMEOUT_SECONDS,
+    STALE_CACHE_MAX_ENTRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ReadResult(NamedTuple):
+    """
+    読み込み結果
+
+    is_stale=Trueの場合、valueは前回取得した古いデータ（fetched_atはその取得時刻）。
+    一度も取得できていない場合はfetched_atがNoneで、valueは既定値。
+    """
+
+    value: Any
+    is_stale: bool
+    fetched_at: Optional[datetime]
+
+
+class CircuitBreaker:
+    """
+    連続失敗でリクエストを遮断するサーキットブレーカー
+
+    closed: 通常状態。失敗がfailure_threshold回続くとopenへ。
+    open: リクエストを遮断。reset_seconds秒経過するとhalf_openへ。
+    half_open: 1件だけ試行を許可し、成功でclosed、失敗でopenへ戻る。
+
+    Args:
+        failure_threshold: openにする連続失敗回数
+        reset_seconds: openからhalf_openへ移るまでの秒数
+        clock: 現在時刻（秒）を返す関数
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds: float = CIRCUIT_RESET_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._failure_threshold = failure_threshold
+        self._reset_seconds = reset_seconds
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """現在の状態（経過時間によるhalf_openへの移行を反映）"""
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def _refresh_state(self) -> None:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self._reset_seconds:
+            self._state = self.HALF_OPEN
+            self._probing = False
+
+    def allow_request(self) -> bool:
+        """
+        リクエストを送ってよいか
+
+        half_open中は最初の1件だけTrueを返す。
+        """
+        with self._lock:
+            self._refresh_state()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """成功を記録（closedに戻す）"""
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Circuit breaker closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """失敗（タイムアウトを含む）を記録"""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self._failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning("Circuit breaker opened after %d failures", self._failures)
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._probing = False
+
+
+class _StaleCache:
+    """最後に正常取得した結果を保持するLRUキャッシュ"""
+
+    def __init__(self, max_entries: int = STALE_CACHE_MAX_ENTRIES):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Any, datetime]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, datetime]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, datetime.now())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+backend_breaker = CircuitBreaker()
+
+_cache = _StaleCache()
+_executor = ThreadPoolExecutor(max_workers=DB_READ_MAX_WORKERS, thread_name_prefix="monk-mode-db")
+_inflight: Dict[Hashable, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def default_timeout() -> float:
+    """読み込みの待ち時間上限の既定値（秒）"""
+    try:
+        return float(os.getenv("MONK_MODE_DB_TIMEOUT", DB_READ_TIMEOUT_SECONDS))
+    except ValueError:
+        return DB_READ_TIMEOUT_SECONDS
+
+
+def _submit(key: Hashable, fetch: Callable[..., Any], args: Tuple, cache: bool = True) -> Future:
+    """取得をバックグラウンドで開始（同じキーの取得が実行中ならそれを共有）"""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future
+
+        future = _executor.submit(fetch, *args)
+        _inflight[key] = future
+
+    def _on_done(done: Future) -> None:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        # 待ち時間上限を過ぎて完了した取得もキャッシュへ反映する（失敗は呼び出し側で記録済み）
+        if cache and done.exception() is None:
+            _cache.put(key, done.result())
+
+    future.add_done_callback(_on_done)
+    return future
+
+
+def _fallback(key: Hashable, default: Any) -> ReadResult:
+    entry = _cache.get(key)
+    if entry is None:
+        return ReadResult(copy.copy(default), True, None)
+    value, fetched_at = entry
+    return ReadResult(copy.copy(value), True, fetched_at)
+
+
+def resilient_read(
+    key: Tuple,
+    fetch: Callable[..., Any],
+    args: Tuple = (),
+    default: Any = None,
+    timeout: Optional[float] = None,
+) -> ReadResult:
+    """
+    待ち時間上限・古いデータへのフォールバック・サーキットブレーカー付きで読み込む
+
+    - 同じキーの取得が実行中でキャッシュがあれば、待たずにキャッシュを返す
+    - ブレーカーが開いていれば、バックエンドへ送らずキャッシュを返す
+    - timeout秒以内に取得できればキャッシュを更新して返す
+    - タイムアウト・失敗時はキャッシュを返す（タイムアウトした取得は継続し、
+      完了時にキャッシュを更新する）
+
+    返す値はキャッシュの浅いコピーのため、呼び出し元でリスト・辞書を変更してよい。
+
+    Args:
+        key: キャッシュキー（先頭要素は処理名。ユーザーIDなど引数を含めること）
+        fetch: 取得関数（失敗時は例外を送出すること）
+        args: 取得関数の引数
+        default: 一度も取得できていない場合に返す値
+        timeout: 待ち時間の上限（秒）。省略時はdefault_timeout()。
+
+    Returns:
+        読み込み結果
+    """
+    with _inflight_lock:
+        refreshing = key in _inflight
+    if refreshing and _cache.get(key) is not None:
+        return _fallback(key, default)
+
+    if not backend_breaker.allow_request():
+        return _fallback(key, default)
+
+    future = _submit(key, fetch, args)
+    try:
+        value = future.result(timeout=timeout if timeout is not None else default_timeout())
+    except FutureTimeoutError:
+        logger.warning("Read %s exceeded latency budget; serving stale data", key[0])
+        backend_breaker.record_failure()
+        return _fallback(key, default)
+    except Exception as e:
+        logger.error("Read %s failed; serving stale data: %s", key[0], e)
+        backend_breaker.record_failure()
+        return _fallback(key, default)
+
+    backend_breaker.record_success()
+    _cache.put(key, value)
+    return ReadResult(copy.copy(value), False, datetime.now())
+
+
+def run_with_budget(
+    key: Tuple,
+    func: Callable[..., Any],
+    args: Tuple = (),
+    timeout: Optional[float] = None,
+) -> Any:
+    """
+    処理をバックグラウンドで実行し、timeout秒まで完了を待つ
+
+    上限を過ぎた処理は中断せずバックグラウンドで継続する。
+    同じキーの処理が実行中なら新たに開始せず、その完了を待つ。
+    結果はキャッシュしない（書き込みなど、読み込み以外の処理用）。
+
+    Args:
+        key: 処理のキー（先頭要素は処理名。ユーザーIDなど引数を含めること）
+        func: 実行する関数
+        args: 関数の引数
+        timeout: 待ち時間の上限（秒）。省略時はdefault_timeout()。
+
+    Returns:
+        関数の戻り値。上限内に完了しなかった・失敗した場合はNone。
+    """
+    future = _submit(key, func, args, cache=False)
+    try:
+        return future.result(timeout=timeout if timeout is not None else default_timeout())
+    except FutureTimeoutError:
+        logger.warning("%s exceeded latency budget; continuing in background", key[0])
+        return None
+    except Exception as e:
+        logger.error("%s failed: %s", key[0], e)
+        return None
@@ -0,0 +1,364 @@
+"""
+ルーティン展開モジュール
+
+routinesテーブルの定義からdaily_tasksを一括生成する。
+ユーザーの有効なルーティンを曜日・日付ごとのインデックスに事前コンパイルし、
+任意の期間を1パスで展開したうえで、1回のupsertで冪等に登録する。
+ユーザーが削除したルーティンタスク（routine_skipsに記録される）は作り直さず、
+display_orderはその日の既存タスクの後ろに続ける。
+
+主要機能:
+- RoutineIndex: 日付→ルーティンのインデックス
+- build_routine_tasks: 期間内のルーティンタスクを生成
+- materialize_routine_tasks: 指定ユーザーのルーティンタスクを登録
+- materialize_all_users: 全ユーザーのルーティンタスクを事前登録
+
+使用例（全ユーザーの今後7日分を事前登録）:
+    python -m utils.routine_scheduler --days 7
+"""
+
+import argparse
+import calendar
+import logging
+from datetime import date, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from supabase import Client
+
+from utils.constants import (
+    ROUTINE_LOOKAHEAD_DAYS,
+    ROUTINE_STATE_PAGE_SIZE,
+    ROUTINE_UPSERT_CHUNK_SIZE,
+    ROUTINE_USER_CHUNK_SIZE,
+)
+from utils.profiler import profiled
+from utils.supabase_client import supabase, get_admin_client
+
+logger = logging.getLogger(__name__)
+
+ROUTINE_COLUMNS = "id, user_id, title, description, category, frequency, weekdays, month_day"
+
+
+def _schema_weekday(target: date) -> int:
+    """Pythonの曜日（0=月曜）をroutines.weekdaysの曜日（0=日曜）に変換"""
+    return (target.weekday() + 1) % 7
+
+
+class RoutineIndex:
+    """
+    日付→ルーティンのインデックス
+
+    daily・weeklyは曜日ごとのリストに、monthlyは日ごとのリストに
+    事前に振り分けておき、日付からの検索を辞書参照だけで行う。
+    月末より大きいmonth_day（例: 31日）は、その月の末日に展開する。
+    """
+
+    def __init__(self, routines: List[Dict]):
+        self._by_weekday: List[List[Dict]] = [[] for _ in range(7)]
+        self._by_month_day: Dict[int, List[Dict]] = {}
+
+        for routine in routines:
+            frequency = routine.get("frequency")
+            if frequency == "daily":
+                for weekday_routines in self._by_weekday:
+                    weekday_routines.append(routine)
+            elif frequency == "weekly":
+                for weekday in set(routine.get("weekdays") or []):
+                    if 0 <= weekday <= 6:
+                        self._by_weekday[weekday].append(routine)
+            elif frequency == "monthly" and routine.get("month_day"):
+                self._by_month_day.setdefault(routine["month_day"], []).append(routine)
+            else:
+                logger.warning("Skipping routine with invalid schedule: %s", routine.get("id"))
+
+    def routines_for(self, target: date) -> List[Dict]:
+        """
+        指定日に実施するルーティンを取得
+
+        Args:
+            target: 対象日
+
+        Returns:
+            ルーティンのリスト
+        """
+        routines = list(self._by_weekday[_schema_weekday(target)])
+
+        if self._by_month_day:
+            routines.extend(self._by_month_day.get(target.day, []))
+
+            last_day = calendar.monthrange(target.year, target.month)[1]
+            if target.day == last_day:
+                for month_day in range(last_day + 1, 32):
+                    routines.extend(self._by_month_day.get(month_day, []))
+
+        return routines
+
+    def expand(self, start_date: date, end_date: date) -> Iterator[Tuple[date, Dict]]:
+        """
+        期間内の（日付, ルーティン）を順に列挙
+
+        Args:
+            start_date: 開始日
+            end_date: 終了日（この日を含む）
+
+        Yields:
+            （日付, ルーティン）のタプル
+        """
+        current = start_date
+        while current <= end_date:
+            for routine in self.routines_for(current):
+                yield current, routine
+            current += timedelta(days=1)
+
+
+def build_routine_tasks(
+    routines: List[Dict],
+    start_date: date,
+    end_date: date,
+    skipped: Optional[Set[Tuple[str, str]]] = None,
+    next_order: Optional[Dict[Tuple[str, str], int]] = None,
+) -> List[Dict]:
+    """
+    ルーティンから期間内のタスクデータを生成
+
+    display_orderは日ごとのルーティン順の連番とし、next_orderがあればその値から始める。
+
+    Args:
+        routines: ルーティンのリスト（user_idを含む）
+        start_date: 開始日
+        end_date: 終了日（この日を含む）
+        skipped: 生成しない（routine_id, task_date）の集合
+        next_order: （user_id, task_date）をキーとする、その日の次のdisplay_order
+
+    Returns:
+        daily_tasksに登録するタスクデータのリスト
+    """
+    index = RoutineIndex(routines)
+    skipped = skipped or set()
+    order_by_day: Dict[Tuple[str, str], int] = dict(next_order or {})
+    tasks = []
+
+    for task_date, routine in index.expand(start_date, end_date):
+        task_date_str = task_date.isoformat()
+        if (routine["id"], task_date_str) in skipped:
+            continue
+
+        order_key = (routine["user_id"], task_date_str)
+        display_order = order_by_day.get(order_key, 0)
+        order_by_day[order_key] = display_order + 1
+
+        tasks.append({
+            "user_id": routine["user_id"],
+            "routine_id": routine["id"],
+            "title": routine["title"],
+            "description": routine.get("description"),
+            "category": routine.get("category"),
+            "priority": "medium",
+            "task_date": task_date_str,
+            "display_order": display_order,
+        })
+
+    return tasks
+
+
+def _iter_range_rows(
+    client: Client,
+    table: str,
+    columns: str,
+    order_columns: Tuple[str, ...],
+    user_ids: List[str],
+    start_date: date,
+    end_date: date,
+) -> Iterator[Dict]:
+    """
+    指定ユーザーの期間内の行をROUTINE_STATE_PAGE_SIZE件ずつページングしながら列挙
+
+    PostgRESTの最大取得件数で結果が切り詰められないよう、
+    一意な列の順に並べて.range()で次のページを取得する。
+    """
+    offset = 0
+    while True:
+        query = client.table(table)\
+            .select(columns)\
+            .in_("user_id", user_ids)\
+            .gte("task_date", start_date.isoformat())\
+            .lte("task_date", end_date.isoformat())
+        for column in order_columns:
+            query = query.order(column)
+
+        rows = query.range(offset, offset + ROUTINE_STATE_PAGE_SIZE - 1).execute().data
+        yield from rows
+
+        if len(rows) < ROUTINE_STATE_PAGE_SIZE:
+            return
+        offset += ROUTINE_STATE_PAGE_SIZE
+
+
+def _load_day_state(
+    client: Client, user_ids: Iterable[str], start_date: date, end_date: date
+) -> Tuple[Set[Tuple[str, str]], Dict[Tuple[str, str], int]]:
+    """
+    期間内の削除済みルーティンタスクと、日ごとの次のdisplay_orderを取得
+
+    URLが長くなりすぎないよう、ユーザーはROUTINE_USER_CHUNK_SIZE人ずつ問い合わせる。
+
+    Returns:
+        （削除済みの（routine_id, task_date）の集合,
+         （user_id, task_date）をキーとする既存タスクの最大display_order+1）
+    """
+    user_ids = sorted(set(user_ids))
+    skipped: Set[Tuple[str, str]] = set()
+    next_order: Dict[Tuple[str, str], int] = {}
+
+    for offset in range(0, len(user_ids), ROUTINE_USER_CHUNK_SIZE):
+        chunk = user_ids[offset:offset + ROUTINE_USER_CHUNK_SIZE]
+
+        for row in _iter_range_rows(
+            client, "routine_skips", "routine_id, task_date",
+            ("routine_id", "task_date"), chunk, start_date, end_date,
+        ):
+            skipped.add((row["routine_id"], row["task_date"]))
+
+        for row in _iter_range_rows(
+            client, "daily_tasks", "id, user_id, task_date, display_order",
+            ("id",), chunk, start_date, end_date,
+        ):
+            key = (row["user_id"], row["task_date"])
+            next_order[key] = max(next_order.get(key, 0), (row["display_order"] or 0) + 1)
+
+    return skipped, next_order
+
+
+def _upsert_routine_tasks(client: Client, tasks: List[Dict]) -> int:
+    """
+    ルーティンタスクを(routine_id, task_date)で冪等に登録
+
+    既に存在するタスク（完了状態や編集内容を含む）は上書きしない。
+
+    Returns:
+        新規登録されたタスク数
+    """
+    created = 0
+    for offset in range(0, len(tasks), ROUTINE_UPSERT_CHUNK_SIZE):
+        chunk = tasks[offset:offset + ROUTINE_UPSERT_CHUNK_SIZE]
+        response = client.table("daily_tasks")\
+            .upsert(chunk, on_conflict="routine_id,task_date", ignore_duplicates=True)\
+            .execute()
+        created += len(response.data)
+    return created
+
+
+@profiled("db")
+def materialize_routine_tasks(
+    user_id: str, start_date: date, end_date: Optional[date] = None
+) -> int:
+    """
+    指定ユーザーのルーティンタスクを期間分まとめて登録
+
+    ルーティン取得1回、削除済み・既存タスクの取得各1回とupsert1回
+    （大量の場合はページ・チャンク単位）で完了する。
+    同じ期間で何度呼び出しても重複タスクは作成されない。
+
+    Args:
+        user_id: ユーザーID
+        start_date: 開始日
+        end_date: 終了日（この日を含む）。省略時はstart_dateのみ。
+
+    Returns:
+        新規登録されたタスク数。失敗時は0。
+    """
+    end_date = end_date or start_date
+
+    try:
+        response = supabase.table("routines")\
+            .select(ROUTINE_COLUMNS)\
+            .eq("user_id", user_id)\
+            .eq("is_active", True)\
+            .execute()
+
+        if not response.data:
+            return 0
+
+        skipped, next_order = _load_day_state(supabase, [user_id], start_date, end_date)
+        tasks = build_routine_tasks(response.data, start_date, end_date, skipped, next_order)
+        if not tasks:
+            return 0
+
+        created = _upsert_routine_tasks(supabase, tasks)
+        logger.info(
+            "Materialized %d routine tasks for user %s (%s - %s)",
+            created, user_id, start_date, end_date,
+        )
+        return created
+
+    except Exception as e:
+        logger.error("Error materializing routine tasks: %s", e)
+        return 0
+
+
+def materialize_all_users(start_date: date, end_date: date) -> int:
+    """
+    全ユーザーのルーティンタスクを事前に一括登録
+
+    有効なルーティンをidのキーセットでページングしながら取得し、
+    ページごとに展開・upsertするため、メモリ使用量はページサイズで抑えられる。
+    service_roleキーが必要。
+
+    Args:
+        start_date: 開始日
+        end_date: 終了日（この日を含む）
+
+    Returns:
+        新規登録されたタスク数
+    """
+    client = get_admin_client()
+    created = 0
+    last_id = None
+
+    while True:
+        query = client.table("routines")\
+            .select(ROUTINE_COLUMNS)\
+            .eq("is_active", True)\
+            .order("id")\
+            .limit(ROUTINE_UPSERT_CHUNK_SIZE)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+
+        routines = query.execute().data
+        if not routines:
+            break
+
+        skipped, next_order = _load_day_state(
+            client, {routine["user_id"] for routine in routines}, start_date, end_date
+        )
+        tasks = build_routine_tasks(routines, start_date, end_date, skipped, next_order)
+        if tasks:
+            created += _upsert_routine_tasks(client, tasks)
+
+        last_id = routines[-1]["id"]
+
+    logger.info("Materialized %d routine tasks for all users (%s - %s)", created, start_date, end_date)
+    return created
+
+
+def main() -> None:
+    """CLIエントリーポイント"""
+    parser = argparse.ArgumentParser(description="ルーティンからデイリータスクを事前生成する")
+    parser.add_argument(
+        "--start", type=date.fromisoformat, default=date.today(),
+        help="開始日（YYYY-MM-DD、既定: 今日）",
+    )
+    parser.add_argument(
+        "--days", type=int, default=ROUTINE_LOOKAHEAD_DAYS,
+        help=f"生成する日数（既定: {ROUTINE_LOOKAHEAD_DAYS}）",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    end_date = args.start + timedelta(days=args.days - 1)
+    created = materialize_all_users(args.start, end_date)
+    print(f"✅ {created}件のルーティンタスクを登録しました（{args.start} 〜 {end_date}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+プロセス内ジョブスケジューラ
+
+外部サービスを使わずに、Streamlitのプロセス内のバックグラウンドスレッドで
+定期ジョブを実行する。ジョブの実行状態（前回・次回の実行時刻、結果）は
+ローカルのSQLiteに保存し、再起動で停止していた間の実行時刻を過ぎていれば
+起動直後に追いかけて実行する。
+
+同じ状態ファイルを共有する複数プロセスが起動していても、次回実行時刻の
+条件付き更新でジョブを取得したプロセスだけが実行する。
+
+実行時刻と日付の区切りはリマインダーと同じくAPP_TIMEZONEで扱うため、
+サーバーのタイムゾーン（UTCのホストなど）によらず同じ時刻に実行する。
+
+主要機能:
+- JobScheduler: ジョブの登録・実行
+- next_weekly: 毎週の実行時刻の計算
+- next_daily: 毎日の実行時刻の計算
+- ensure_scheduler_started: アプリ標準ジョブの開始（プロセス内で1回）
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Callable, Dict, Iterator, Optional
+
+from utils.constants import (
+    LOCAL_STATE_DIR,
+    ROUTINE_LOOKAHEAD_DAYS,
+    SCHEDULER_POLL_SECONDS,
+)
+from utils.reminders import APP_TZ, to_app_time
+from utils.routine_scheduler import materialize_all_users
+from utils.supabase_client import SUPABASE_SERVICE_ROLE_KEY
+from utils.weekly_report import precompute_weekly_reports, week_bounds
+
+logger = logging.getLogger(__name__)
+
+NextRunFunc = Callable[[datetime], datetime]
+
+
+def next_weekly(weekday: int, at: dt_time) -> NextRunFunc:
+    """
+    毎週指定曜日・時刻に実行する次回時刻の計算関数を作成
+
+    Args:
+        weekday: 曜日（0=月曜）
+        at: 実行時刻（APP_TIMEZONE）
+
+    Returns:
+        基準時刻より後の次回実行時刻を返す関数
+    """
+    def _next(now: datetime) -> datetime:
+        now = to_app_time(now)
+        days_ahead = (weekday - now.weekday()) % 7
+        candidate = datetime.combine(now.date() + timedelta(days=days_ahead), at, tzinfo=APP_TZ)
+        if candidate <= now:
+            candidate += timedelta(days=7)
+        return candidate
+
+    return _next
+
+
+def next_daily(at: dt_time) -> NextRunFunc:
+    """
+    毎日指定時刻に実行する次回時刻の計算関数を作成
+
+    Args:
+        at: 実行時刻（APP_TIMEZONE）
+
+    Returns:
+        基準時刻より後の次回実行時刻を返す関数
+    """
+    def _next(now: datetime) -> datetime:
+        now = to_app_time(now)
+        candidate = datetime.combine(now.date(), at, tzinfo=APP_TZ)
+        if candidate <= now:
+            candidate += timedelta(days=1)
+        return candidate
+
+    return _next
+
+
+class JobScheduler:
+    """
+    永続化された状態を持つプロセス内ジョブスケジューラ
+
+    Args:
+        state_path: ジョブ状態を保存するSQLiteファイルのパス
+        poll_seconds: 実行時刻を確認する最大間隔（秒）
+    """
+
+    def __init__(self, state_path: str, poll_seconds: float = SCHEDULER_POLL_SECONDS):
+        self._state_path = state_path
+        self._poll_seconds = poll_seconds
+        self._jobs: Dict[str, Dict] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    name TEXT PRIMARY KEY,
+                    next_run_at TEXT NOT NULL,
+                    last_run_at TEXT,
+                    last_status TEXT,
+                    last_error TEXT
+                )
+            """)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """状態DBへの接続（正常終了時にコミットし、必ずクローズする）"""
+        conn = sqlite3.connect(self._state_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], object],
+        next_run: NextRunFunc,
+        run_missed: bool = True,
+    ) -> None:
+        """
+        ジョブを登録
+
+        初めて登録するジョブは、run_missed=Trueなら起動直後に1回実行し、
+        以降はnext_runの時刻に実行する。
+
+        Args:
+            name: ジョブ名（状態の保存キー）
+            func: 実行する関数
+            next_run: 基準時刻から次回実行時刻を計算する関数
+            run_missed: 初回登録時に即時実行するか
+        """
+        self._jobs[name] = {"func": func, "next_run": next_run}
+
+        now = to_app_time()
+        first_run = now if run_missed else next_run(now)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs (name, next_run_at) VALUES (?, ?)",
+                (name, first_run.isoformat()),
+            )
+
+    def get_job_state(self, name: str) -> Optional[Dict]:
+        """
+        ジョブの保存状態を取得
+
+        Returns:
+            next_run_at, last_run_at, last_status, last_error の辞書。未登録ならNone。
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT next_run_at, last_run_at, last_status, last_error FROM jobs WHERE name = ?",
+                (name,),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("next_run_at", "last_run_at", "last_status", "last_error"), row))
+
+    def _claim(self, name: str, now: datetime) -> bool:
+        """実行時刻を過ぎたジョブを取得し、次回実行時刻を先に進める"""
+        next_run_at = self._jobs[name]["next_run"](now).isoformat()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET next_run_at = ? WHERE name = ? AND next_run_at <= ?",
+                (next_run_at, name, now.isoformat()),
+            )
+            return cursor.rowcount == 1
+
+    def _record_result(self, name: str, started: datetime, error: Optional[str]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET last_run_at = ?, last_status = ?, last_error = ? WHERE name = ?",
+                (started.isoformat(), "error" if error else "success", error, name),
+            )
+
+    def run_pending(self, now: Optional[datetime] = None) -> int:
+        """
+        実行時刻を過ぎたジョブをすべて実行
+
+        Args:
+            now: 基準時刻（省略時は現在時刻。タイムゾーンなしはAPP_TIMEZONEとみなす）
+
+        Returns:
+            実行したジョブ数
+        """
+        now = to_app_time(now)
+        executed = 0
+
+        for name, job in self._jobs.items():
+            if not self._claim(name, now):
+                continue
+
+            logger.info("Running scheduled job: %s", name)
+            error = None
+            try:
+                job["func"]()
+            except Exception as e:
+                error = str(e)
+                logger.error("Scheduled job %s failed: %s", name, e)
+            self._record_result(name, now, error)
+            executed += 1
+
+        return executed
+
+    def _seconds_until_next(self) -> float:
+        with self._connect() as conn:
+            row = conn.execute("SELECT MIN(next_run_at) FROM jobs").fetchone()
+        if not row or row[0] is None:
+            return self._poll_seconds
+        # タイムゾーンなしの時刻は以前の形式の状態（APP_TIMEZONEとみなす）
+        wait = (to_app_time(datetime.fromisoformat(row[0])) - to_app_time()).total_seconds()
+        return min(max(wait, 0.0), self._poll_seconds)
+
+    def _loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.run_pending()
+                wait = self._seconds_until_next()
+            except Exception as e:
+                logger.error("Scheduler loop error: %s", e)
+                wait = self._poll_seconds
+            self._stop_event.wait(wait)
+
+    def start(self) -> None:
+        """バックグラウンドスレッドで実行を開始"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="monk-mode-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """バックグラウンドスレッドを停止"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+_scheduler: Optional[JobScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def _precompute_last_week_reports() -> None:
+    """前週分の週次レポートを全ユーザー分集計"""
+    last_week_start, _ = week_bounds(to_app_time().date() - timedelta(days=7))
+    precompute_weekly_reports(last_week_start)
+
+
+def _materialize_upcoming_routines() -> None:
+    """全ユーザーの今後のルーティンタスクを事前登録"""
+    today = to_app_time().date()
+    materialize_all_users(today, today + timedelta(days=ROUTINE_LOOKAHEAD_DAYS - 1))
+
+
+def ensure_scheduler_started() -> Optional[JobScheduler]:
+    """
+    アプリ標準のバックグラウンドジョブを開始（プロセス内で1回のみ）
+
+    全ユーザーを対象とするためservice_roleキーが必要。
+    SUPABASE_SERVICE_ROLE_KEYが未設定の環境では何もしない。
+
+    登録ジョブ:
+    - weekly_reports: 毎週月曜0:05に前週の週次レポートを集計
+    - routine_tasks: 毎日0:10に今後のルーティンタスクを登録
+
+    Returns:
+        起動したスケジューラ。未設定で起動しない場合はNone。
+    """
+    global _scheduler
+
+    if not SUPABASE_SERVICE_ROLE_KEY:
+        return None
+
+    with _scheduler_lock:
+        if _scheduler is None:
+            state_dir = os.getenv("MONK_MODE_STATE_DIR", LOCAL_STATE_DIR)
+            scheduler = JobScheduler(os.path.join(state_dir, "scheduler.sqlite3"))
+            scheduler.add_job(
+                "weekly_reports", _precompute_last_week_reports, next_weekly(0, dt_time(0, 5))
+            )
+            scheduler.add_job(
+                "routine_tasks", _materialize_upcoming_routines, next_daily(dt_time(0, 10))
+            )
+            scheduler.start()
+            _scheduler = scheduler
+
+    return _scheduler
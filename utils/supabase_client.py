@@ -1,16 +1,45 @@
 import os
+from typing import Optional
+
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
+from utils.exceptions import AuthenticationError
+
 # 環境変数読み込み
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
 # Supabaseクライアント初期化
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+_admin_client: Optional[Client] = None
+
+
+def get_admin_client() -> Client:
+    """
+    全ユーザー横断のバッチ処理用クライアントを取得
+
+    service_roleキーはRLSをバイパスするため、バックグラウンド処理や
+    CLIからのみ使用し、画面からのリクエストには使用しないこと。
+
+    Returns:
+        service_roleキーで初期化したクライアント
+
+    Raises:
+        AuthenticationError: SUPABASE_SERVICE_ROLE_KEYが未設定の場合
+    """
+    global _admin_client
+    if _admin_client is None:
+        if not SUPABASE_SERVICE_ROLE_KEY:
+            raise AuthenticationError("SUPABASE_SERVICE_ROLE_KEY が設定されていません")
+        _admin_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    return _admin_client
+
+
 def test_connection():
     """接続テスト"""
     try:
@@ -0,0 +1,257 @@
+"""
+週次レポート集計モジュール
+
+1週間（月曜〜日曜）のタスク完了数・習慣達成率・集中時間を集計し、
+weekly_reportsテーブルに1ユーザー1週1行でキャッシュする。
+週の切り替わりにバックグラウンドジョブ（utils/scheduler.py）が全ユーザー分を
+事前集計し、未集計の週は参照時に集計して保存するため、
+週次振り返り画面は通常1行の読み込みだけで表示できる。
+
+週の終了後に記録が追加・更新・削除されると、DBのトリガーがその週の行の
+source_updated_atを更新し、is_stale（集計開始より後に元データが変わった）になる。
+参照時はその1行のis_staleだけを見て、古ければ集計し直す。
+weekly_reportsはユーザーからは参照のみ可能なため、保存はservice_roleキーの
+クライアントで行う（未設定の環境では保存しない）。
+
+主要機能:
+- week_bounds: 日付が属する週の開始日・終了日
+- get_weekly_report: 週次レポートの取得（未集計なら集計して保存）
+- precompute_weekly_reports: 全ユーザーの週次レポートを事前集計
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from supabase import Client
+
+from utils.constants import APP_TIMEZONE, HABIT_CHECK_FIELDS, REPORT_PAGE_SIZE
+from utils.profiler import profiled
+from utils.supabase_client import SUPABASE_SERVICE_ROLE_KEY, supabase, get_admin_client
+
+logger = logging.getLogger(__name__)
+
+
+def week_bounds(target: date) -> Tuple[date, date]:
+    """
+    日付が属する週（月曜〜日曜）を取得
+
+    Args:
+        target: 対象日
+
+    Returns:
+        （週の開始日, 週の終了日）
+    """
+    week_start = target - timedelta(days=target.weekday())
+    return week_start, week_start + timedelta(days=6)
+
+
+def _empty_report(user_id: str, week_start: date) -> Dict:
+    return {
+        "user_id": user_id,
+        "week_start_date": week_start.isoformat(),
+        "week_end_date": (week_start + timedelta(days=6)).isoformat(),
+        "task_total": 0,
+        "task_completed": 0,
+        "habit_days_recorded": 0,
+        "habit_adherence_rate": 0.0,
+        "focus_minutes": 0,
+    }
+
+
+def _iter_rows(
+    client: Client,
+    table: str,
+    columns: str,
+    date_column: str,
+    week_start: date,
+    user_id: Optional[str],
+) -> Iterator[Dict]:
+    """
+    週の範囲の行を(user_id, 日付列, id)のキーセットでページングしながら列挙
+
+    idを持たないテーブル（daily_focus_stats）は(user_id, 日付列)が一意なため、
+    その2列でページングする。
+    """
+    week_end = week_start + timedelta(days=6)
+    has_id = table != "daily_focus_stats"
+    last_row: Optional[Dict] = None
+
+    while True:
+        query = client.table(table)\
+            .select(columns)\
+            .gte(date_column, week_start.isoformat())\
+            .lte(date_column, week_end.isoformat())\
+            .order("user_id")\
+            .order(date_column)
+        if has_id:
+            query = query.order("id")
+        if user_id is not None:
+            query = query.eq("user_id", user_id)
+
+        if last_row is not None:
+            uid, day = last_row["user_id"], last_row[date_column]
+            after_day = f"and(user_id.eq.{uid},{date_column}.gt.{day})"
+            if has_id:
+                after_day += f",and(user_id.eq.{uid},{date_column}.eq.{day},id.gt.{last_row['id']})"
+            query = query.or_(f"user_id.gt.{uid},{after_day}")
+
+        rows = query.limit(REPORT_PAGE_SIZE).execute().data
+        yield from rows
+
+        if len(rows) < REPORT_PAGE_SIZE:
+            return
+        last_row = rows[-1]
+
+
+def _aggregate_week(
+    client: Client, week_start: date, user_id: Optional[str] = None
+) -> Dict[str, Dict]:
+    """
+    週の記録をユーザーごとに集計
+
+    Args:
+        client: 使用するクライアント
+        week_start: 週の開始日（月曜）
+        user_id: 指定時はそのユーザーのみ集計
+
+    Returns:
+        ユーザーIDをキー、週次レポートを値とする辞書（記録のあるユーザーのみ）
+    """
+    reports: Dict[str, Dict] = {}
+    habit_checks: Dict[str, int] = {}
+
+    def _report(uid: str) -> Dict:
+        if uid not in reports:
+            reports[uid] = _empty_report(uid, week_start)
+        return reports[uid]
+
+    for row in _iter_rows(
+        client, "daily_tasks", "id, user_id, task_date, is_completed",
+        "task_date", week_start, user_id,
+    ):
+        report = _report(row["user_id"])
+        report["task_total"] += 1
+        report["task_completed"] += 1 if row["is_completed"] else 0
+
+    habit_columns = "id, user_id, record_date, " + ", ".join(HABIT_CHECK_FIELDS)
+    for row in _iter_rows(client, "habit_records", habit_columns, "record_date", week_start, user_id):
+        report = _report(row["user_id"])
+        report["habit_days_recorded"] += 1
+        habit_checks[row["user_id"]] = habit_checks.get(row["user_id"], 0) + sum(
+            1 for field in HABIT_CHECK_FIELDS if row.get(field)
+        )
+
+    for row in _iter_rows(
+        client, "daily_focus_stats", "user_id, stat_date, focus_minutes",
+        "stat_date", week_start, user_id,
+    ):
+        _report(row["user_id"])["focus_minutes"] += row["focus_minutes"]
+
+    # 記録のない日は未達成として扱い、7日分のチェック項目数で割る
+    possible_checks = 7 * len(HABIT_CHECK_FIELDS)
+    for uid, checks in habit_checks.items():
+        reports[uid]["habit_adherence_rate"] = round(checks / possible_checks, 3)
+
+    return reports
+
+
+def _save_reports(client: Client, reports: List[Dict], computed_at: datetime) -> None:
+    """
+    週次レポートをまとめてupsert
+
+    computed_atには集計を開始した時刻を渡す。集計中に元データが変わった場合も
+    source_updated_atの方が新しくなり、次回の参照で集計し直される。
+    """
+    started = computed_at.isoformat()
+    for offset in range(0, len(reports), REPORT_PAGE_SIZE):
+        chunk = [dict(report, computed_at=started) for report in reports[offset:offset + REPORT_PAGE_SIZE]]
+        client.table("weekly_reports")\
+            .upsert(chunk, on_conflict="user_id,week_start_date")\
+            .execute()
+
+
+@profiled("db")
+def get_weekly_report(user_id: str, week_start: date) -> Optional[Dict]:
+    """
+    週次レポートを取得
+
+    終了済みの週は集計済みの1行を読み込み、古くなっていなければそのまま返す。
+    未集計または古い場合は集計し直し、service_roleキーがあれば保存する。
+    進行中の週は記録が増え続けるため、保存せずにその場で集計する。
+    週の終了はAPP_TIMEZONEの日付で判定する。
+
+    Args:
+        user_id: ユーザーID
+        week_start: 週の開始日（月曜）
+
+    Returns:
+        週次レポート。失敗時はNone。
+    """
+    try:
+        today = datetime.now(ZoneInfo(APP_TIMEZONE)).date()
+        week_finished = week_start + timedelta(days=6) < today
+
+        if week_finished:
+            response = supabase.table("weekly_reports")\
+                .select("*")\
+                .eq("user_id", user_id)\
+                .eq("week_start_date", week_start.isoformat())\
+                .limit(1)\
+                .execute()
+            if response.data and not response.data[0].get("is_stale"):
+                return response.data[0]
+
+        started = datetime.now().astimezone()
+        report = _aggregate_week(supabase, week_start, user_id).get(user_id)
+        report = report or _empty_report(user_id, week_start)
+
+        if week_finished and SUPABASE_SERVICE_ROLE_KEY:
+            _save_reports(get_admin_client(), [report], started)
+            logger.info("Recomputed weekly report: %s %s", user_id, week_start)
+
+        return report
+
+    except Exception as e:
+        logger.error("Error fetching weekly report: %s", e)
+        return None
+
+
+def precompute_weekly_reports(week_start: date) -> int:
+    """
+    全ユーザーの週次レポートを事前集計して保存
+
+    記録のないユーザーにも0件のレポートを保存し、参照時の集計を不要にする。
+    service_roleキーが必要。
+
+    Args:
+        week_start: 週の開始日（月曜）
+
+    Returns:
+        保存したレポート数
+    """
+    client = get_admin_client()
+    started = datetime.now().astimezone()
+    reports = _aggregate_week(client, week_start)
+
+    last_id = None
+    while True:
+        query = client.table("user_profiles")\
+            .select("id")\
+            .order("id")\
+            .limit(REPORT_PAGE_SIZE)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+
+        profiles = query.execute().data
+        if not profiles:
+            break
+        for profile in profiles:
+            if profile["id"] not in reports:
+                reports[profile["id"]] = _empty_report(profile["id"], week_start)
+        last_id = profiles[-1]["id"]
+
+    _save_reports(client, list(reports.values()), started)
+    logger.info("Precomputed %d weekly reports for week %s", len(reports), week_start)
+    return len(reports)